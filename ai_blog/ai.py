@@ -0,0 +1,61 @@
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class AIProvider(ABC):
+    """
+    Model behind `blog.helpers`: replies to comments and tells whether texts are safe to
+    publish. Providers create their client on first use, so importing the app does not
+    import any SDK.
+    """
+    # Part of the moderation verdict cache key, so verdicts of different models or
+    # safety settings never mix.
+    moderation_profile = ''
+
+    @abstractmethod
+    def reply(self, prompt: str) -> str:
+        ...
+
+    @abstractmethod
+    async def areply(self, prompt: str) -> str:
+        ...
+
+    @abstractmethod
+    def is_safe(self, prompt: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def ais_safe(self, prompt: str) -> bool:
+        ...
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_ai_provider(name: str = None) -> AIProvider:
+    """
+    The provider configured in `AI_PROVIDERS` under `name` (default: `AI_PROVIDER`),
+    created on first use and then shared by the process.
+    """
+    name = name or settings.AI_PROVIDER
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            if name not in _providers:
+                config = settings.AI_PROVIDERS[name]
+                _providers[name] = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+            provider = _providers[name]
+    return provider
+
+
+@receiver(setting_changed)
+def reset_ai_providers(setting, **kwargs):
+    if setting == 'AI_PROVIDERS':
+        with _providers_lock:
+            _providers.clear()
@@ -1,8 +1,13 @@
+import math
+
 from ninja_jwt.controller import NinjaJWTDefaultController
 from ninja_extra import NinjaExtraAPI
+from rest_framework.status import HTTP_503_SERVICE_UNAVAILABLE
 
+from ai_blog.throttling import ThrottledError
 from user.api import UserController
-from blog.api import BlogController, BlogAnalyticsController
+from blog.api import BlogController, AsyncBlogController, BlogAnalyticsController
+from blog.constants import AI_SERVICE_BUSY_ERROR
 
 
 api = NinjaExtraAPI()
@@ -10,5 +15,14 @@ api.register_controllers(
     NinjaJWTDefaultController,
     UserController,
     BlogController,
+    AsyncBlogController,
     BlogAnalyticsController
 )
+
+
+@api.exception_handler(ThrottledError)
+def ai_service_busy(request, exc):
+    # The Gemini client refused the call (quota wait too long or exhausted, or circuit open).
+    response = api.create_response(request, {'detail': AI_SERVICE_BUSY_ERROR}, status=HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(math.ceil(exc.retry_after))
+    return response
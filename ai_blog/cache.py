@@ -0,0 +1,146 @@
+import threading
+import time
+
+from cachetools import TTLCache
+from django.core.cache import caches
+
+
+_MISSING = object()
+_LOAD_LOCK_STRIPES = 64
+
+
+class TieredCache:
+    """
+    Two-level cache: a bounded in-process LRU (with TTL) in front of a shared
+    Django cache backend (LocMem by default, Redis in production).
+    """
+
+    def __init__(self, prefix: str, maxsize: int, local_ttl: int, shared_ttl=None, alias='default'):
+        self.prefix = prefix
+        self.alias = alias
+        self.shared_ttl = shared_ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self._lock = threading.Lock()
+        self._load_locks = [threading.Lock() for _ in range(_LOAD_LOCK_STRIPES)]
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def _shared_key(self, key) -> str:
+        return f'{self.prefix}:{key}'
+
+    def _get_local(self, key):
+        with self._lock:
+            value = self._local.get(key, _MISSING)
+            if value is not _MISSING:
+                self.local_hits += 1
+            return value
+
+    def _record_shared(self, key, value, default):
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.shared_hits += 1
+            self._local[key] = value
+            return value
+
+    def get(self, key, default=None):
+        value = self._get_local(key)
+        if value is not _MISSING:
+            return value
+
+        if self.shared is not None:
+            value = self.shared.get(self._shared_key(key), _MISSING)
+        return self._record_shared(key, value, default)
+
+    async def aget(self, key, default=None):
+        value = self._get_local(key)
+        if value is not _MISSING:
+            return value
+
+        if self.shared is not None:
+            value = await self.shared.aget(self._shared_key(key), _MISSING)
+        return self._record_shared(key, value, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._local[key] = value
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, timeout=self.shared_ttl)
+
+    async def aset(self, key, value):
+        with self._lock:
+            self._local[key] = value
+        if self.shared is not None:
+            await self.shared.aset(self._shared_key(key), value, timeout=self.shared_ttl)
+
+    def get_or_set(self, key, loader, lock_timeout=5, poll_interval=0.02):
+        """
+        Read-through lookup. On a miss only one caller per key runs `loader`: threads of
+        this process queue on a striped lock, other processes wait on a `cache.add` lock
+        in the shared tier and pick up the value once it is stored.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._load_locks[hash(key) % _LOAD_LOCK_STRIPES]:
+            with self._lock:
+                value = self._local.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            if self.shared is None:
+                return self._load(key, loader)
+
+            lock_key = self._shared_key(f'lock:{key}')
+            if self.shared.add(lock_key, 1, timeout=lock_timeout):
+                try:
+                    return self._load(key, loader)
+                finally:
+                    self.shared.delete(lock_key)
+
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(poll_interval)
+                value = self.shared.get(self._shared_key(key), _MISSING)
+                if value is not _MISSING:
+                    with self._lock:
+                        self._local[key] = value
+                    return value
+            # The other loader died or is too slow: stop waiting and load it here.
+            return self._load(key, loader)
+
+    def _load(self, key, loader):
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self.local_hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'local_size': len(self._local),
+                'local_maxsize': self._local.maxsize,
+            }
@@ -1,7 +1,187 @@
-import google.generativeai as genai
+import asyncio
+import random
+import threading
+import time
+from functools import cached_property
 
-from ai_blog.settings import GEMINI_API_KEY, GEMINI_MODEL_NAME
+from ai_blog.ai import AIProvider
+from ai_blog.settings import (
+    GEMINI_API_KEY, GEMINI_MODEL_NAME, GEMINI_RATE_LIMIT_REDIS_URL, GEMINI_RATE_LIMIT_RPM, GEMINI_RATE_LIMIT_BURST,
+    GEMINI_ACQUIRE_TIMEOUT, GEMINI_RETRY_ATTEMPTS, GEMINI_RETRY_BASE_DELAY, GEMINI_RETRY_MAX_DELAY,
+    GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_COOLDOWN, GEMINI_CONCURRENCY_INITIAL, GEMINI_CONCURRENCY_MAX
+)
+from ai_blog.throttling import (
+    RateLimitTimeout, QuotaExhausted, TokenBucket, LocalTokenBucket, RedisTokenBucket, CircuitBreaker, AdaptiveConcurrencyLimit
+)
 
 
-genai.configure(api_key=GEMINI_API_KEY)
-ai_model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME)
+class GeminiClient:
+    """
+    Drop-in for `genai.GenerativeModel.generate_content(_async)` shared by web and Celery
+    workers. Each attempt waits for a concurrency slot and a token of the shared
+    `limiter`; quota and server errors are retried with jittered exponential backoff,
+    and repeated server errors open the circuit `breaker` so callers fail fast. A quota
+    error that outlasts the retries is raised as `QuotaExhausted`.
+    """
+
+    def __init__(
+        self, model, limiter: TokenBucket, breaker: CircuitBreaker, concurrency: AdaptiveConcurrencyLimit,
+        acquire_timeout: float, retry_attempts: int, retry_base_delay: float, retry_max_delay: float
+    ):
+        self.model = model
+        self.limiter = limiter
+        self.breaker = breaker
+        self.concurrency = concurrency
+        self.acquire_timeout = acquire_timeout
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        from google.api_core import exceptions
+        # Over quota (ResourceExhausted is a subclass): back off, shrink the concurrency
+        # limit, but the service itself is fine.
+        self.quota_errors = (exceptions.TooManyRequests,)
+        # Gemini itself is failing: retried, and counted by the circuit breaker.
+        self.transient_errors = (exceptions.ServerError,)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: workers rejected together do not come back together.
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def _finish(self, started: float, error: Exception = None) -> bool:
+        """
+        Reports an attempt to the limiters; True when it is worth retrying.
+        """
+        self.concurrency.release(started, overloaded=isinstance(error, self.quota_errors))
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, self.transient_errors):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_ignored()
+        return isinstance(error, self.quota_errors + self.transient_errors)
+
+    def _give_up(self, error: Exception):
+        # Still over quota: surfaced like a local refusal, so the API answers 503 with
+        # Retry-After and the Celery tasks retry later.
+        if isinstance(error, self.quota_errors):
+            raise QuotaExhausted('Gemini quota is exhausted', retry_after=self.retry_max_delay) from error
+
+    def generate_content(self, *args, **kwargs):
+        for attempt in range(self.retry_attempts):
+            self.breaker.before_call()
+            deadline = time.monotonic() + self.acquire_timeout
+            try:
+                started = self.concurrency.acquire(self.acquire_timeout)
+            except RateLimitTimeout:
+                # Frees the half-open probe this call may have taken.
+                self.breaker.record_ignored()
+                raise
+            try:
+                self.limiter.acquire(deadline - time.monotonic())
+                response = self.model.generate_content(*args, **kwargs)
+            except Exception as error:
+                if not self._finish(started, error) or attempt == self.retry_attempts - 1:
+                    self._give_up(error)
+                    raise
+            else:
+                self._finish(started)
+                return response
+            time.sleep(self._backoff(attempt))
+
+    async def generate_content_async(self, *args, **kwargs):
+        for attempt in range(self.retry_attempts):
+            self.breaker.before_call()
+            deadline = time.monotonic() + self.acquire_timeout
+            try:
+                started = await self.concurrency.aacquire(self.acquire_timeout)
+            except RateLimitTimeout:
+                # Frees the half-open probe this call may have taken.
+                self.breaker.record_ignored()
+                raise
+            try:
+                await self.limiter.aacquire(deadline - time.monotonic())
+                response = await self.model.generate_content_async(*args, **kwargs)
+            except Exception as error:
+                if not self._finish(started, error) or attempt == self.retry_attempts - 1:
+                    self._give_up(error)
+                    raise
+            else:
+                self._finish(started)
+                return response
+            await asyncio.sleep(self._backoff(attempt))
+
+    def stats(self) -> dict:
+        return {
+            'concurrency_limit': self.concurrency.limit,
+            'inflight': self.concurrency.inflight,
+            'circuit': self.breaker.state,
+        }
+
+
+def _rate_limiter() -> TokenBucket:
+    rate = GEMINI_RATE_LIMIT_RPM / 60
+    if GEMINI_RATE_LIMIT_REDIS_URL:
+        return RedisTokenBucket(
+            GEMINI_RATE_LIMIT_REDIS_URL, f'gemini:rate:{GEMINI_MODEL_NAME}', rate, GEMINI_RATE_LIMIT_BURST
+        )
+    return LocalTokenBucket(rate, GEMINI_RATE_LIMIT_BURST)
+
+
+class GeminiProvider(AIProvider):
+    SAFETY_SETTINGS = {
+        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_LOW_AND_ABOVE',
+        'HARM_CATEGORY_HARASSMENT': 'BLOCK_LOW_AND_ABOVE',
+        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_LOW_AND_ABOVE',
+        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_LOW_AND_ABOVE'
+    }
+    moderation_profile = ','.join(
+        [GEMINI_MODEL_NAME, *(f'{category}:{threshold}' for category, threshold in sorted(SAFETY_SETTINGS.items()))]
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @cached_property
+    def model(self) -> GeminiClient:
+        # google.generativeai pulls in grpc and protobuf: only paid by processes that call it.
+        import google.generativeai as genai
+
+        with self._lock:
+            # Another thread may have created it while this one waited for the lock.
+            if 'model' in self.__dict__:
+                return self.__dict__['model']
+            genai.configure(api_key=GEMINI_API_KEY)
+            return GeminiClient(
+                model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME),
+                limiter = _rate_limiter(),
+                breaker = CircuitBreaker(threshold=GEMINI_BREAKER_THRESHOLD, cooldown=GEMINI_BREAKER_COOLDOWN),
+                concurrency = AdaptiveConcurrencyLimit(
+                    initial=GEMINI_CONCURRENCY_INITIAL, minimum=1, maximum=GEMINI_CONCURRENCY_MAX
+                ),
+                acquire_timeout = GEMINI_ACQUIRE_TIMEOUT,
+                retry_attempts = GEMINI_RETRY_ATTEMPTS,
+                retry_base_delay = GEMINI_RETRY_BASE_DELAY,
+                retry_max_delay = GEMINI_RETRY_MAX_DELAY
+            )
+
+    @staticmethod
+    def _is_safe_response(response) -> bool:
+        from google.generativeai.protos import Candidate
+
+        return response.candidates[0].finish_reason != Candidate.FinishReason.SAFETY
+
+    def reply(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def areply(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    def is_safe(self, prompt: str) -> bool:
+        return self._is_safe_response(self.model.generate_content(prompt, safety_settings=self.SAFETY_SETTINGS))
+
+    async def ais_safe(self, prompt: str) -> bool:
+        response = await self.model.generate_content_async(prompt, safety_settings=self.SAFETY_SETTINGS)
+        return self._is_safe_response(response)
+
@@ -0,0 +1,79 @@
+import asyncio
+import random
+import re
+import time
+import zlib
+
+from ai_blog.ai import AIProvider
+from ai_blog.throttling import ThrottledError
+
+
+class InjectedFailure(ThrottledError):
+    pass
+
+
+class LocalAIProvider(AIProvider):
+    """
+    Offline stand-in for Gemini: texts containing one of `unsafe_words` (whole words,
+    case-insensitive) are unsafe, replies are picked from `replies` by a hash of the
+    prompt. `latency` (+ up to `latency_jitter`) seconds are slept per call and
+    `error_rate` of the calls fail like a throttled Gemini client; both draw from a
+    generator seeded with `seed`, so a run can be reproduced.
+    """
+    UNSAFE_WORDS = (
+        'kill', 'killing', 'dead', 'die', 'kys', 'suicide', 'murder', 'hate', 'idiot', 'moron', 'stupid'
+    )
+    REPLIES = (
+        'Thanks for sharing your thoughts!',
+        'Interesting point, I had not looked at it that way.',
+        'Glad you found the post useful.',
+        'Good question, I will cover it in a follow-up post.',
+    )
+
+    def __init__(
+        self, latency: float = 0, latency_jitter: float = 0, error_rate: float = 0, seed: int = 0,
+        unsafe_words=UNSAFE_WORDS, replies=REPLIES
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.replies = replies
+        self.moderation_profile = 'local:' + ','.join(sorted(unsafe_words))
+        self._unsafe = re.compile(r'\b(?:' + '|'.join(map(re.escape, unsafe_words)) + r')\b', re.IGNORECASE)
+        self._random = random.Random(seed)
+
+    def _draw(self) -> tuple[float, bool]:
+        # (delay, whether the call fails); failures also take their time, as upstream.
+        delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        return delay, self._random.random() < self.error_rate
+
+    def _call(self, fails: bool, answer, prompt: str):
+        if fails:
+            raise InjectedFailure('Injected AI provider failure', retry_after=1)
+        return answer(prompt)
+
+    def _reply(self, prompt: str) -> str:
+        return self.replies[zlib.crc32(prompt.encode()) % len(self.replies)]
+
+    def _is_safe(self, prompt: str) -> bool:
+        return self._unsafe.search(prompt) is None
+
+    def reply(self, prompt: str) -> str:
+        delay, fails = self._draw()
+        time.sleep(delay)
+        return self._call(fails, self._reply, prompt)
+
+    async def areply(self, prompt: str) -> str:
+        delay, fails = self._draw()
+        await asyncio.sleep(delay)
+        return self._call(fails, self._reply, prompt)
+
+    def is_safe(self, prompt: str) -> bool:
+        delay, fails = self._draw()
+        time.sleep(delay)
+        return self._call(fails, self._is_safe, prompt)
+
+    async def ais_safe(self, prompt: str) -> bool:
+        delay, fails = self._draw()
+        await asyncio.sleep(delay)
+        return self._call(fails, self._is_safe, prompt)
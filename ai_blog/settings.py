@@ -74,10 +74,24 @@ WSGI_APPLICATION = 'ai_blog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# `ai_blog.sqlite3` is the stock SQLite backend plus per-connection pragmas and
+# BEGIN IMMEDIATE transactions: readers never wait for writers (WAL) and concurrent
+# writers queue for up to `timeout` seconds instead of failing with "database is locked".
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'ai_blog.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'cache_size': -64000,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
     }
 }
 
@@ -130,6 +144,26 @@ NINJA_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Cache
+
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # Room for a couple of years of per-day analytics entries next to moderation verdicts.
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 # Celery
 
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER', 'redis://redis:6379/0')
@@ -139,8 +173,118 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-due-replies': {
+        'task': 'blog.tasks.dispatch_due_replies',
+        'schedule': timedelta(seconds=15),
+    },
+}
+
+AUTO_REPLY_SWEEP_BATCH_SIZE = 500
+AUTO_REPLY_TASK_BATCH_SIZE = 50
+AUTO_REPLY_POOL_SIZE = 8
+# A failed auto reply is due again after 1, 2, 4... times the base delay (seconds),
+# and given up after the last attempt.
+AUTO_REPLY_RETRY_BASE_DELAY = 60
+AUTO_REPLY_MAX_ATTEMPTS = 5
+
+# Analytics
+
+# Closed days of the comment breakdowns are cached without expiry; a write to such a
+# day replaces its entry with a short-lived tombstone until it is recomputed.
+ANALYTICS_CACHE_ALIAS = 'default'
+ANALYTICS_CACHE_INVALIDATION_TTL = 60
+# Longest date range, in days, a breakdown endpoint accepts.
+ANALYTICS_MAX_RANGE_DAYS = 366
+
+# Post and comment payloads served by `retrieve_post`/`retrieve_comment`. Writes drop
+# the entries; the short local TTL bounds how long other processes may serve old ones.
+CONTENT_CACHE_ALIAS = 'default'
+CONTENT_CACHE_SIZE = 2048
+CONTENT_CACHE_LOCAL_TTL = 5
+CONTENT_CACHE_TTL = 60 * 5
+CONTENT_CACHE_LOCK_TIMEOUT = 5
+
+# Users authenticated by `user.authentication.CachedJWTAuth`. Set the alias to None to
+# keep the cache per process only.
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_LOCAL_TTL = 30
+AUTH_USER_CACHE_TTL = 60 * 5
+
+# AI provider
+
+# Backend of replies and moderation, see `ai_blog.ai.get_ai_provider`. `local` answers
+# offline: rule-based verdicts and canned replies, with optional injected latency and
+# failures to reproduce moderation load.
+AI_PROVIDER = os.environ.get('AI_PROVIDER', 'gemini')
+AI_PROVIDERS = {
+    'gemini': {
+        'BACKEND': 'ai_blog.gemini.GeminiProvider',
+    },
+    'local': {
+        'BACKEND': 'ai_blog.local_ai.LocalAIProvider',
+        'OPTIONS': {
+            'latency': float(os.environ.get('AI_LOCAL_LATENCY', 0)),
+            'latency_jitter': float(os.environ.get('AI_LOCAL_LATENCY_JITTER', 0)),
+            'error_rate': float(os.environ.get('AI_LOCAL_ERROR_RATE', 0)),
+            'seed': int(os.environ.get('AI_LOCAL_SEED', 0)),
+        },
+    },
+}
 
 # Gemini
 
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+# Requests per minute allowed by the API key, shared by all web and Celery processes
+# through Redis (per process when no Redis is configured).
+GEMINI_RATE_LIMIT_REDIS_URL = os.environ.get('GEMINI_RATE_LIMIT_REDIS_URL', CACHE_REDIS_URL)
+GEMINI_RATE_LIMIT_RPM = int(os.environ.get('GEMINI_RATE_LIMIT_RPM', 15))
+GEMINI_RATE_LIMIT_BURST = 5
+# Longest a call waits for a concurrency slot and a rate limit token.
+GEMINI_ACQUIRE_TIMEOUT = 10
+GEMINI_RETRY_ATTEMPTS = 4
+GEMINI_RETRY_BASE_DELAY = 0.5
+GEMINI_RETRY_MAX_DELAY = 8
+GEMINI_BREAKER_THRESHOLD = 5
+GEMINI_BREAKER_COOLDOWN = 30
+GEMINI_CONCURRENCY_INITIAL = 4
+GEMINI_CONCURRENCY_MAX = 32
+
+# Moderation
+
+# Persist posts and comments as `pending` and moderate them in a Celery task
+# instead of holding the request open until Gemini answers.
+DEFERRED_MODERATION = os.environ.get('DEFERRED_MODERATION', '').lower() in ('1', 'true')
+
+MODERATION_CACHE_ALIAS = 'default'
+MODERATION_CACHE_SIZE = 4096
+MODERATION_CACHE_LOCAL_TTL = 60 * 10
+MODERATION_CACHE_TTL = 60 * 60 * 24
+MODERATION_BATCH_WINDOW_MS = int(os.environ.get('MODERATION_BATCH_WINDOW_MS', 0))
+MODERATION_BATCH_MAX_SIZE = 16
+
+# Clear-cut texts resolved locally before any Gemini call. Blocklisted phrases match
+# anywhere in the text, allowlisted phrases only when they are the whole text.
+MODERATION_PREFILTER_ENABLED = True
+MODERATION_PREFILTER_BLOCKLIST = [
+    'kys',
+    'kill yourself',
+    'kill urself',
+    'go die',
+    'neck yourself',
+    'hang yourself',
+    'drink bleach',
+]
+MODERATION_PREFILTER_ALLOWLIST = [
+    '+1',
+    'so relatable',
+    'thanks',
+    'thank you',
+    'great post',
+    'nice post',
+    'agreed',
+    'well said',
+]
@@ -0,0 +1,31 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend for concurrent web and worker processes. Extra OPTIONS:
+
+    - `pragmas`: {name: value} applied to every new connection (WAL journal etc.).
+    - `transaction_mode`: 'DEFERRED' (SQLite's default), 'IMMEDIATE' or 'EXCLUSIVE'.
+      IMMEDIATE takes the write lock when an atomic block starts, so a writer waits
+      out `timeout` instead of failing with "database is locked" when it upgrades
+      a read transaction that another writer got ahead of.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        self.transaction_mode = params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
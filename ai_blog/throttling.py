@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class ThrottledError(Exception):
+    """
+    The call was refused, locally or by an exhausted upstream quota; `retry_after` is a
+    hint in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class RateLimitTimeout(ThrottledError):
+    pass
+
+class CircuitOpenError(ThrottledError):
+    pass
+
+class QuotaExhausted(ThrottledError):
+    pass
+
+
+class TokenBucket(ABC):
+    """
+    `rate` tokens per second, up to `capacity` saved for bursts. Subclasses implement
+    `reserve`, which takes the tokens or returns how long to wait before trying again.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+    @abstractmethod
+    def reserve(self, tokens: float = 1) -> float:
+        ...
+
+    async def areserve(self, tokens: float = 1) -> float:
+        return self.reserve(tokens)
+
+    def acquire(self, timeout: float, tokens: float = 1):
+        deadline = time.monotonic() + timeout
+        while wait := self.reserve(tokens):
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout('Rate limit wait exceeds the timeout', retry_after=wait)
+            time.sleep(wait)
+
+    async def aacquire(self, timeout: float, tokens: float = 1):
+        deadline = time.monotonic() + timeout
+        while wait := await self.areserve(tokens):
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout('Rate limit wait exceeds the timeout', retry_after=wait)
+            await asyncio.sleep(wait)
+
+
+class LocalTokenBucket(TokenBucket):
+    """
+    In-process bucket: the limit applies per process. Used in tests and when no Redis is
+    configured.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        super().__init__(rate, capacity)
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+
+# Refill and take in one round trip. Redis' clock is used so that hosts with skewed
+# clocks share one bucket; the wait is returned as a string (Lua numbers become integers).
+_RESERVE_SCRIPT = """
+local rate, capacity, requested = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Bucket shared by every process using the same Redis `key` (web and Celery workers).
+    """
+
+    def __init__(self, url: str, key: str, rate: float, capacity: float):
+        import redis
+
+        super().__init__(rate, capacity)
+        self.key = key
+        self._client = redis.Redis.from_url(url)
+        self._reserve = self._client.register_script(_RESERVE_SCRIPT)
+
+    def reserve(self, tokens: float = 1) -> float:
+        return float(self._reserve(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+
+    async def areserve(self, tokens: float = 1) -> float:
+        return await asyncio.to_thread(self.reserve, tokens)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and refuses calls for `cooldown`
+    seconds, then lets a single probe through: its success closes the circuit again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half_open' if time.monotonic() - self._opened_at >= self.cooldown else 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError('Circuit is open', retry_after=max(remaining, 1))
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_ignored(self):
+        # The probe ended without saying anything about the upstream (e.g. a client error).
+        with self._lock:
+            self._probing = False
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit on in-flight calls: +1/limit per success, halved on overload. Only
+    calls started after the last decrease can decrease it again, so one burst of
+    rejections halves the limit once instead of collapsing it to `minimum`.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.inflight = 0
+        self._decreased_at = float('-inf')
+        self._condition = threading.Condition()
+
+    def try_acquire(self):
+        with self._condition:
+            if self.inflight >= int(self.limit):
+                return None
+            self.inflight += 1
+            return time.monotonic()
+
+    def acquire(self, timeout: float) -> float:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.inflight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitTimeout('No free concurrency slot', retry_after=1)
+                self._condition.wait(remaining)
+            self.inflight += 1
+            return time.monotonic()
+
+    async def aacquire(self, timeout: float, poll_interval: float = 0.01) -> float:
+        deadline = time.monotonic() + timeout
+        while (started := self.try_acquire()) is None:
+            if time.monotonic() >= deadline:
+                raise RateLimitTimeout('No free concurrency slot', retry_after=1)
+            await asyncio.sleep(poll_interval)
+        return started
+
+    def release(self, started: float, overloaded: bool = False):
+        with self._condition:
+            self.inflight -= 1
+            if overloaded:
+                if started >= self._decreased_at:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._decreased_at = time.monotonic()
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
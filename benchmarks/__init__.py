@@ -0,0 +1,13 @@
+"""
+Standalone benchmarks. Run from the project root, e.g.:
+
+    python -m benchmarks.async_moderation
+"""
+import os
+
+import django
+
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_blog.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+django.setup()
@@ -0,0 +1,69 @@
+"""
+Repeated 365-day comment breakdowns with and without the closed-day cache.
+
+Without the cache every request aggregates the whole range of CommentDailyStats; with
+it only today is recomputed and the other days are one `get_many` away.
+
+    python -m benchmarks.analytics_cache --days 365 --requests 200
+"""
+import argparse
+import time
+from datetime import timedelta
+from itertools import product
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .db import test_database
+
+from blog.analytics import daily_stats_cache
+from blog.models import CommentDailyStats
+
+
+def seed_stats(days: int):
+    today = timezone.localdate()
+    CommentDailyStats.objects.bulk_create([
+        CommentDailyStats(
+            day=today - timedelta(days=offset), generated_by_ai=ai, is_response=response, is_blocked=blocked,
+            count=offset % 50 + 1
+        )
+        for offset in range(days)
+        for ai, response, blocked in product((False, True), repeat=3)
+    ], batch_size=5000)
+
+
+def run(requests: int, days: int, cached: bool) -> float:
+    date_to = timezone.localdate()
+    date_from = date_to - timedelta(days=days - 1)
+    cache.clear()
+    daily_stats_cache.reset_stats()
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            cache.clear()
+        daily_stats_cache.get_range(date_from, date_to)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        seed_stats(args.days)
+
+        uncached = run(args.requests, args.days, cached=False)
+        print(f'recomputed every time: {uncached / args.requests * 1000:.2f} ms/request')
+
+        cached = run(args.requests, args.days, cached=True)
+        stats = daily_stats_cache.stats()
+        print(f'closed days cached:    {cached / args.requests * 1000:.2f} ms/request')
+        print(f"hit ratio:             {stats['hit_ratio']:.1%}")
+        print(f"avg recompute:         {stats['avg_recompute_ms']:.2f} ms over {stats['recomputes']} recomputes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Moderation throughput of the sync path (one blocked worker thread per request) against
+the async path (one event loop holding every in-flight request), using the offline
+provider with fixed latency.
+
+    python -m benchmarks.async_moderation --requests 500 --latency 0.05 --threads 8
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import fake_model
+
+from blog import helpers
+
+
+def run_sync(requests: int, threads: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(helpers.ai_verify_safety, (f'sync comment {i}' for i in range(requests))))
+    return time.perf_counter() - started
+
+
+async def run_async(requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(content):
+        async with semaphore:
+            return await helpers.ai_verify_safety_async(content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(verify(f'async comment {i}') for i in range(requests)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.05, help='model latency, seconds')
+    parser.add_argument('--threads', type=int, default=8, help='sync worker threads (WSGI workers)')
+    parser.add_argument('--concurrency', type=int, default=500, help='max in-flight async requests')
+    args = parser.parse_args()
+
+    with fake_model.local_provider(latency=args.latency):
+        sync_elapsed = run_sync(args.requests, args.threads)
+        async_elapsed = asyncio.run(run_async(args.requests, args.concurrency))
+
+    print(f'{args.requests} moderation requests, model latency {args.latency * 1000:.0f} ms')
+    print(f'sync  ({args.threads} threads):        {sync_elapsed:7.2f} s  {args.requests / sync_elapsed:8.1f} req/s')
+    print(f'async ({args.concurrency} in flight):    {async_elapsed:7.2f} s  {args.requests / async_elapsed:8.1f} req/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Queries and latency per authenticated read with and without the user cache.
+
+Before: JWTAuth loaded the `user.User` row on every request. After: CachedJWTAuth
+serves it from `user_cache` until the user is saved or the entry expires.
+
+    python -m benchmarks.auth_cache --requests 500
+"""
+import argparse
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from ninja_jwt.tokens import RefreshToken
+
+from .db import test_database
+
+from blog.content_cache import content_cache
+from blog.models import Post, Comment
+from user.authentication import user_cache
+from user.models import User
+
+
+def run(client: Client, user: User, path: str, requests: int, cached: bool) -> tuple[float, float]:
+    cache.clear()
+    user_cache.clear_local()
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(requests):
+            if not cached:
+                user_cache.delete(user.id)
+            client.get(path)
+        elapsed = time.perf_counter() - started
+    return len(queries.captured_queries) / requests, elapsed / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with test_database():
+        user = User.objects.create(username='reader')
+        post = Post.objects.create(title='Hot post', content='content', user=user)
+        Comment.objects.bulk_create([Comment(content=f'comment {i}', post=post, user=user) for i in range(20)])
+
+        client = Client(headers={'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'})
+
+        for label, path in (('comment page', f'/api/blog/post/{post.id}/comments'), ('single post', f'/api/blog/post/{post.id}')):
+            content_cache.clear_local()
+            uncached = run(client, user, path, args.requests, cached=False)
+            cached = run(client, user, path, args.requests, cached=True)
+            print(f'{label}:')
+            print(f'  user lookup per request: {uncached[0]:.2f} queries, {uncached[1]:.2f} ms/request')
+            print(f'  cached user:             {cached[0]:.2f} queries, {cached[1]:.2f} ms/request')
+            print(f'  saved:                   {uncached[0] - cached[0]:.2f} queries/request')
+
+
+if __name__ == '__main__':
+    main()
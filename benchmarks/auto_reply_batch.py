@@ -0,0 +1,43 @@
+"""
+Auto replies per second of one worker running `auto_comment_response_batch` for
+different pool sizes, with the offline provider at a fixed latency.
+
+    python -m benchmarks.auto_reply_batch --comments 200 --latency 0.05
+"""
+import argparse
+import time
+from unittest import mock
+
+from . import fake_model
+from .db import test_database
+
+from user.models import User
+from blog.models import Post, Comment
+from blog import tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--comments', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='model latency, seconds')
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    with test_database(), fake_model.local_provider(latency=args.latency):
+        user = User.objects.create(username='benchmark')
+        post = Post.objects.create(title='Benchmark post', content='Benchmark content', user=user)
+
+        print(f'{args.comments} due comments, model latency {args.latency * 1000:.0f} ms')
+        for pool_size in args.pool_sizes:
+            comments = Comment.objects.bulk_create(
+                Comment(content=f'comment {i}', post=post, user=user) for i in range(args.comments)
+            )
+            with mock.patch.object(tasks, 'AUTO_REPLY_POOL_SIZE', pool_size):
+                started = time.perf_counter()
+                tasks.auto_comment_response_batch(comment_ids=[comment.id for comment in comments])
+                elapsed = time.perf_counter() - started
+            print(f'pool size {pool_size:3}: {elapsed:6.2f} s  {args.comments / elapsed:8.1f} replies/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Cost of one scheduler tick with many auto replies scheduled in the future.
+
+Before: every comment on an auto-reply user's posts had its own one-off PeriodicTask,
+and django_celery_beat's DatabaseScheduler loads every enabled row on each tick.
+After: `dispatch_due_replies` walks the partial `respond_at` index and only touches
+due comments.
+
+    python -m benchmarks.due_replies --scheduled 100000 --due 100
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+from .db import test_database
+
+from user.models import User
+from blog.models import Post, Comment
+from blog import tasks
+
+
+def seed_comments(user, post, scheduled: int, due: int):
+    now = timezone.now()
+    comments = [
+        Comment(content=f'comment {i}', post=post, user=user, respond_at=now + timedelta(minutes=5 + i % 600))
+        for i in range(scheduled)
+    ]
+    comments += [
+        Comment(content=f'due comment {i}', post=post, user=user, respond_at=now - timedelta(seconds=i))
+        for i in range(due)
+    ]
+    Comment.objects.bulk_create(comments, batch_size=5000)
+
+
+def seed_periodic_tasks(count: int):
+    crontab = CrontabSchedule.objects.create(minute='0', hour='0')
+    PeriodicTask.objects.bulk_create([
+        PeriodicTask(
+            crontab = crontab,
+            name = f'Auto comment response {i}',
+            task = 'blog.tasks.auto_comment_response',
+            kwargs = json.dumps({'user_id': 1, 'comment_id': i}),
+            one_off = True
+        )
+        for i in range(count)
+    ], batch_size=5000)
+
+
+def timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scheduled', type=int, default=100_000)
+    parser.add_argument('--due', type=int, default=100)
+    args = parser.parse_args()
+
+    with test_database():
+        user = User.objects.create(username='benchmark', auto_post_reply=5)
+        post = Post.objects.create(title='Benchmark post', content='Benchmark content', user=user)
+
+        seed_periodic_tasks(args.scheduled + args.due)
+        # What DatabaseScheduler.all_as_schedule() reads on every tick.
+        old_tick = timed(lambda: list(PeriodicTask.objects.enabled().select_related('crontab')))
+
+        seed_comments(user, post, args.scheduled, args.due)
+        with mock.patch.object(tasks, 'auto_comment_response_batch') as auto_comment_response_batch:
+            new_tick = timed(tasks.dispatch_due_replies)
+            idle_tick = timed(tasks.dispatch_due_replies)
+        batches = auto_comment_response_batch.delay.call_args_list
+        dispatched = sum(len(batch.kwargs['comment_ids']) for batch in batches)
+
+    print(f'{args.scheduled} replies scheduled, {args.due} due')
+    print(f'PeriodicTask scan per beat tick:   {old_tick * 1000:9.1f} ms')
+    print(f'dispatch_due_replies, {args.due} due:     {new_tick * 1000:9.1f} ms '
+          f'({dispatched} dispatched in {len(batches)} tasks)')
+    print(f'dispatch_due_replies, nothing due: {idle_tick * 1000:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
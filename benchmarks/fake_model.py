@@ -0,0 +1,42 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.test import override_settings
+from google.generativeai.protos import Candidate
+
+
+class FakeModel:
+    """
+    Stand-in for `genai.GenerativeModel` with a fixed latency, so benchmarks measure our
+    code and not Google's. Prompts containing one of `unsafe_words` are blocked.
+    """
+
+    def __init__(self, latency: float = 0.05, unsafe_words=('kys', 'kill')):
+        self.latency = latency
+        self.unsafe_words = unsafe_words
+        self.calls = 0
+
+    def _response(self, prompt: str):
+        self.calls += 1
+        is_safe = not any(word in prompt for word in self.unsafe_words)
+        finish_reason = Candidate.FinishReason.STOP if is_safe else Candidate.FinishReason.SAFETY
+        return SimpleNamespace(candidates=[SimpleNamespace(finish_reason=finish_reason)], text='Thanks!')
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return self._response(prompt)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._response(prompt)
+
+
+def local_provider(latency: float, **options):
+    """
+    Settings selecting the offline `LocalAIProvider` with `latency`, for benchmarks that
+    go through `blog.helpers` like the app does.
+    """
+    local = {'BACKEND': 'ai_blog.local_ai.LocalAIProvider', 'OPTIONS': {'latency': latency, **options}}
+    return override_settings(AI_PROVIDER='local', AI_PROVIDERS={**settings.AI_PROVIDERS, 'local': local})
@@ -0,0 +1,110 @@
+"""
+Workers hammering a model that enforces a requests-per-second quota: bare calls vs
+`GeminiClient` with the limiter at the quota, and with the limiter set too high so
+only retries and the adaptive concurrency limit keep it in check.
+
+    python -m benchmarks.gemini_client --quota 20 --workers 32 --duration 5
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from google.api_core import exceptions
+
+from . import fake_model
+
+from ai_blog.gemini import GeminiClient
+from ai_blog.throttling import LocalTokenBucket, CircuitBreaker, AdaptiveConcurrencyLimit, ThrottledError
+
+
+class QuotaModel(fake_model.FakeModel):
+    """
+    FakeModel that answers 429 once more than `quota` requests per second arrive.
+    """
+
+    def __init__(self, quota: float, latency: float):
+        super().__init__(latency=latency)
+        self.quota = LocalTokenBucket(rate=quota, capacity=quota)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        if self.quota.reserve():
+            with self._lock:
+                self.rejected += 1
+            raise exceptions.ResourceExhausted('Quota exceeded')
+        return super().generate_content(prompt, **kwargs)
+
+
+def run(model, call, workers: int, duration: float) -> dict:
+    latencies, failures = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        while time.monotonic() < stop_at:
+            started = time.monotonic()
+            try:
+                call('Is this text save to public: hello')
+            except (exceptions.GoogleAPICallError, ThrottledError) as error:
+                with lock:
+                    failures.append(error)
+                continue
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    began = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Calls queued before the deadline still finish, so throughput is over the real run time.
+    elapsed = time.monotonic() - began
+
+    return {
+        'ok/s': len(latencies) / elapsed,
+        'failed': len(failures),
+        '429s': model.rejected,
+        'p95 ms': statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0,
+    }
+
+
+def client(model, rate: float, quota: float) -> GeminiClient:
+    return GeminiClient(
+        model = model,
+        limiter = LocalTokenBucket(rate=rate, capacity=max(1, quota / 4)),
+        breaker = CircuitBreaker(threshold=5, cooldown=30),
+        concurrency = AdaptiveConcurrencyLimit(initial=4, minimum=1, maximum=64),
+        acquire_timeout = 10,
+        retry_attempts = 4,
+        retry_base_delay = 0.1,
+        retry_max_delay = 2
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quota', type=float, default=20, help='requests per second the fake model accepts')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'quota {args.quota:g} req/s, {args.workers} workers, {args.duration:g} s')
+    scenarios = {
+        'bare model': lambda model: model.generate_content,
+        'client, limiter at quota': lambda model: client(model, args.quota, args.quota).generate_content,
+        'client, limiter 2x quota': lambda model: client(model, args.quota * 2, args.quota).generate_content,
+    }
+    for name, make_call in scenarios.items():
+        model = QuotaModel(args.quota, args.latency)
+        # Start from an empty quota, as after a burst.
+        model.quota._tokens = 0
+        result = run(model, make_call(model), args.workers, args.duration)
+        print(f'{name:26} ' + '  '.join(f'{key} {value:8.0f}' for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
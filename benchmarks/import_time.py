@@ -0,0 +1,63 @@
+"""
+Cold-start import cost of the process entry points, measured with `python -X importtime`
+in fresh interpreters. Reports the median total and the heaviest top-level packages.
+
+    python -m benchmarks.import_time --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+
+# What each process imports before it can do any work.
+ENTRY_POINTS = {
+    # The WSGI application plus the URLconf, which Django imports on the first request.
+    'web': 'from ai_blog.wsgi import application; import ai_blog.urls',
+    # The worker imports every autodiscovered `tasks` module at startup.
+    'worker': 'from ai_blog.celery import celery_app; celery_app.loader.import_default_modules()',
+    'beat': 'from ai_blog.celery import celery_app; import django; django.setup(); '
+            'import django_celery_beat.schedulers',
+    # `manage.py migrate` and friends run the system checks, which load the URLconf.
+    'manage': 'import django; django.setup(); from django.core import checks; checks.run_checks()',
+}
+
+
+def measure(code: str) -> dict[str, int]:
+    """
+    Import time in microseconds spent in each top-level package imported by `code`
+    (self time of all of its modules, wherever they were imported from).
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'ai_blog.settings', 'SECRET_KEY': 'benchmark-only-secret-key'}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True, text=True, check=True
+    )
+
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line.removeprefix('import time:').split('|')
+        packages[name.strip().split('.')[0]] += int(own)
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--entry-point', action='append', choices=list(ENTRY_POINTS), help='default: all')
+    args = parser.parse_args()
+
+    for entry_point in args.entry_point or ENTRY_POINTS:
+        runs = [measure(ENTRY_POINTS[entry_point]) for _ in range(args.runs)]
+        total = statistics.median(sum(packages.values()) for packages in runs) / 1000
+        heaviest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+        print(f'{entry_point:8} {total:8.1f} ms   ' + ', '.join(f'{name} {time / 1000:.0f}' for name, time in heaviest))
+
+
+if __name__ == '__main__':
+    main()
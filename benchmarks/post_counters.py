@@ -0,0 +1,83 @@
+"""
+A page of the post feed with comment counts: denormalized Post counters vs the
+`Count` annotations over Comment they replace.
+
+    python -m benchmarks.post_counters --posts 2000 --comments 200 --pages 50
+"""
+import argparse
+import time
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .db import test_database
+
+from blog.api import _posts_for_output
+from blog.models import Post, ModerationStatus
+from user.models import User
+
+
+PUBLISHED = Q(comment__moderation_status=ModerationStatus.APPROVED, comment__is_blocked=False)
+
+
+def seed(posts: int, comments: int):
+    user = User.objects.create(username='author')
+    Post.objects.bulk_create([Post(title=f'Post {i}', content='content', user=user) for i in range(posts)])
+    now = timezone.now().isoformat(sep=' ')
+    post_ids = list(Post.objects.values_list('id', flat=True))
+
+    # Raw inserts: the counters are filled in afterwards by the reconcile command.
+    with connection.cursor() as cursor:
+        for post_id in post_ids:
+            cursor.executemany(
+                'INSERT INTO blog_comment (content, post_id, user_id, generated_by_ai, is_response, is_blocked, '
+                'moderation_status, created_at, depth, reply_attempts) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0, 0)',
+                [('comment', post_id, user.id, i % 3 == 0, i % 3 == 0, i % 10 == 0,
+                  ModerationStatus.BLOCKED if i % 10 == 0 else ModerationStatus.APPROVED, now)
+                 for i in range(comments)]
+            )
+
+
+def counted_page(limit: int) -> list:
+    return list(_posts_for_output().filter(moderation_status=ModerationStatus.APPROVED).annotate(
+        counted_comments=Count('comment', filter=PUBLISHED),
+        counted_blocked=Count('comment', filter=Q(comment__is_blocked=True)),
+        counted_ai_replies=Count('comment', filter=PUBLISHED & Q(comment__generated_by_ai=True, comment__is_response=True)),
+        counted_last_comment_at=Max('comment__created_at', filter=PUBLISHED),
+    ).order_by('-created_at', '-id')[:limit])
+
+
+def stored_page(limit: int) -> list:
+    return list(_posts_for_output().filter(moderation_status=ModerationStatus.APPROVED).order_by('-created_at', '-id')[:limit])
+
+
+def timed(function, pages: int) -> float:
+    started = time.perf_counter()
+    for _ in range(pages):
+        function()
+    return (time.perf_counter() - started) / pages * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=200, help='comments per post')
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with test_database():
+        seed(args.posts, args.comments)
+        call_command('reconcile_post_counters')
+
+        counted = timed(lambda: counted_page(args.limit), args.pages)
+        stored = timed(lambda: stored_page(args.limit), args.pages)
+        print(f'{args.posts} posts x {args.comments} comments, {args.limit} posts/page')
+        print(f'Count() annotations:  {counted:8.2f} ms/page')
+        print(f'stored counters:      {stored:8.2f} ms/page')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Share of moderation traffic resolved by the lexical prefilter and its per-call cost.
+
+    python -m benchmarks.prefilter --comments 100000
+"""
+import argparse
+import random
+
+from blog.helpers import prefilter
+
+
+SAMPLE_COMMENTS = [
+    '+1',
+    'So relatable',
+    'thanks!',
+    'Great post',
+    'kys',
+    'k y s',
+    'just go die already',
+    'I think you have valid point on this topic.',
+    'You are wrong actually. There is mistake on line 10 in your code.',
+    'Could you share the source for the second chart?',
+    'This is the worst take I have read this week.',
+    'Skyscrapers in this city keep getting taller.',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--comments', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if prefilter is None:
+        raise SystemExit('MODERATION_PREFILTER_ENABLED is off.')
+
+    generator = random.Random(args.seed)
+    prefilter.reset_stats()
+    for _ in range(args.comments):
+        prefilter.check(generator.choice(SAMPLE_COMMENTS))
+
+    stats = prefilter.stats()
+    print(f"checked:            {stats['checks']}")
+    print(f"resolved locally:   {stats['resolved_ratio']:.1%} "
+          f"({stats['blocked']} blocked, {stats['allowed']} allowed)")
+    print(f"avg cost per call:  {stats['avg_cost_us']:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Full-text search over a generated corpus: FTS5 index vs the `icontains` scan a client
+would otherwise need.
+
+    python -m benchmarks.search --rows 1000000 --queries 50
+"""
+import argparse
+import itertools
+import random
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+from .db import test_database
+
+from blog.models import Post, Comment, ModerationStatus
+from blog.search import search
+from user.models import User
+
+
+VOCABULARY = [
+    'sourdough', 'python', 'django', 'garden', 'travel', 'coffee', 'camera', 'winter', 'running', 'guitar',
+    'recipe', 'review', 'startup', 'kernel', 'bicycle', 'mountain', 'novel', 'painting', 'database', 'index',
+] + [f'word{i}' for i in range(5000)]
+
+
+def seed_corpus(rows: int, generator: random.Random):
+    user = User.objects.create(username='author')
+    post = Post.objects.create(title='Corpus', content='corpus', user=user)
+    now = timezone.now().isoformat(sep=' ')
+    cum_weights = list(itertools.accumulate([50] * 20 + [1] * (len(VOCABULARY) - 20)))
+
+    def sentence():
+        return ' '.join(generator.choices(VOCABULARY, cum_weights=cum_weights, k=12))
+
+    with connection.cursor() as cursor:
+        for start in range(0, rows, 10_000):
+            cursor.executemany(
+                'INSERT INTO blog_comment (content, post_id, user_id, generated_by_ai, is_response, is_blocked, '
+                'moderation_status, created_at, depth, reply_attempts) VALUES (%s, %s, %s, 0, 0, 0, %s, %s, 0, 0)',
+                [(sentence(), post.id, user.id, ModerationStatus.APPROVED, now)
+                 for _ in range(min(10_000, rows - start))]
+            )
+
+
+def scan_page(query: str, limit: int) -> list:
+    comments = Comment.objects.all()
+    for word in query.split():
+        comments = comments.filter(content__icontains=word)
+    return list(comments.order_by('-created_at', '-id')[:limit])
+
+
+def timed(function, queries: list[str]) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        function(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generator = random.Random(args.seed)
+    with test_database():
+        started = time.perf_counter()
+        seed_corpus(args.rows, generator)
+        print(f'indexed {args.rows} comments in {time.perf_counter() - started:.1f} s')
+
+        # One common and one rare word, so neither side can stop after the first few rows.
+        queries = [f'{generator.choice(VOCABULARY[:20])} {generator.choice(VOCABULARY[20:])}' for _ in range(args.queries)]
+        fts = timed(lambda query: search(query, limit=20), queries)
+        scan = timed(lambda query: scan_page(query, limit=20), queries)
+        print(f'fts5 ranked page:     {fts:8.2f} ms/query')
+        print(f'icontains scan page:  {scan:8.2f} ms/query (unranked)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Concurrent reads and writes against a file SQLite database, stock backend vs
+`ai_blog.sqlite3` with the OPTIONS from settings.
+
+Writers run `read, then insert` inside `transaction.atomic`, like most write paths of
+the app. With the stock rollback journal and DEFERRED transactions readers stall behind
+writers and a writer upgrading its read lock fails with "database is locked".
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --writers 4 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, transaction, OperationalError
+
+
+STOCK_OPTIONS = {'timeout': 5}
+
+
+def register(alias: str, engine: str, options: dict, path: str):
+    connections.settings[alias] = {
+        **connections['default'].settings_dict, 'ENGINE': engine, 'NAME': path, 'OPTIONS': options
+    }
+    with connections[alias].cursor() as cursor:
+        cursor.execute('CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, content TEXT)')
+        cursor.execute('CREATE INDEX comment_post ON comment (post_id)')
+        cursor.executemany(
+            'INSERT INTO comment (post_id, content) VALUES (%s, %s)',
+            [(i % 100, 'seed comment') for i in range(10_000)]
+        )
+    connections[alias].close()
+
+
+def reader(alias: str, stop: threading.Event, results: Counter, lock: threading.Lock):
+    done = failed = 0
+    while not stop.is_set():
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT id, content FROM comment WHERE post_id = %s ORDER BY id DESC LIMIT 20', [done % 100])
+                cursor.fetchall()
+            done += 1
+        except OperationalError:
+            failed += 1
+    connections[alias].close()
+    with lock:
+        results.update(reads=done, read_errors=failed)
+
+
+def writer(alias: str, stop: threading.Event, results: Counter, lock: threading.Lock):
+    done = failed = 0
+    while not stop.is_set():
+        try:
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM comment WHERE post_id = %s', [done % 100])
+                count = cursor.fetchone()[0]
+                cursor.execute('INSERT INTO comment (post_id, content) VALUES (%s, %s)', [done % 100, f'#{count}'])
+            done += 1
+        except OperationalError:
+            failed += 1
+    connections[alias].close()
+    with lock:
+        results.update(writes=done, write_errors=failed)
+
+
+def run(alias: str, readers: int, writers: int, seconds: float) -> Counter:
+    stop = threading.Event()
+    results = Counter()
+    lock = threading.Lock()
+    threads = [threading.Thread(target=reader, args=(alias, stop, results, lock)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(alias, stop, results, lock)) for _ in range(writers)]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    tuned_options = settings.DATABASES['default']['OPTIONS']
+    with tempfile.TemporaryDirectory() as directory:
+        for alias, engine, options in (
+            ('stock', 'django.db.backends.sqlite3', STOCK_OPTIONS),
+            ('tuned', 'ai_blog.sqlite3', tuned_options),
+        ):
+            register(alias, engine, options, os.path.join(directory, f'{alias}.sqlite3'))
+            results = run(alias, args.readers, args.writers, args.seconds)
+            print(f'{alias}:')
+            print(f"  reads/s:  {results['reads'] / args.seconds:10.0f}   errors: {results['read_errors']}")
+            print(f"  writes/s: {results['writes'] / args.seconds:10.0f}   errors: {results['write_errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Loading the reply trees of a page of top-level comments: one query over the
+materialized `root`/`depth` columns vs walking `CommentResponse` one level at a time.
+
+    python -m benchmarks.thread --threads 20 --depth 30 --width 50
+"""
+import argparse
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .db import test_database
+
+from blog.api import _with_replies
+from blog.models import Post, Comment, CommentResponse, ModerationStatus
+from blog.schemas import CommentOutputSchema
+from user.models import User
+
+
+def seed_threads(post, user, threads: int, depth: int, width: int) -> list[Comment]:
+    """
+    `threads` top-level comments, alternating between a chain `depth` replies deep and
+    `width` direct replies each answered once.
+    """
+    top_level = Comment.objects.bulk_create([Comment(content=f'Thread {i}', post=post, user=user) for i in range(threads)])
+    for index, comment in enumerate(top_level):
+        level = [comment]
+        for _ in range(depth if index % 2 else 2):
+            replies = Comment.objects.bulk_create([
+                Comment(content='Reply', post=post, user=user, is_response=True, **parent.reply_thread_fields())
+                for parent in level for _ in range(width if index % 2 == 0 and parent is comment else 1)
+            ])
+            CommentResponse.objects.bulk_create([
+                CommentResponse(comment=reply.parent, response=reply) for reply in replies
+            ])
+            level = replies
+    return top_level
+
+
+def walk_responses(top_level: list[Comment], max_depth: int) -> list[dict]:
+    """
+    The same nested output built the way clients had to before: one query per level of
+    replies, following `CommentResponse`.
+    """
+    nodes = {comment.id: {**CommentOutputSchema.from_orm(comment).model_dump(), 'replies': []} for comment in top_level}
+    level = list(nodes)
+    for _ in range(max_depth):
+        links = CommentResponse.objects.select_related('response__user').filter(
+            comment_id__in=level,
+            response__moderation_status=ModerationStatus.APPROVED, response__is_blocked=False
+        ).order_by('response__created_at', 'response_id')
+        level = []
+        for link in links:
+            node = {**CommentOutputSchema.from_orm(link.response).model_dump(), 'replies': []}
+            nodes[link.comment_id]['replies'].append(node)
+            nodes[link.response_id] = node
+            level.append(link.response_id)
+        if not level:
+            break
+    return [nodes[comment.id] for comment in top_level]
+
+
+def timed(function, repeat: int) -> tuple[float, int]:
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        elapsed = time.perf_counter() - started
+    return elapsed / repeat * 1000, len(queries) // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=30)
+    parser.add_argument('--width', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with test_database():
+        user = User.objects.create(username='author')
+        post = Post.objects.create(title='Threads', content='threads', user=user)
+        top_level = list(Comment.objects.select_related('user').filter(
+            id__in=[comment.id for comment in seed_threads(post, user, args.threads, args.depth, args.width)]
+        ))
+        print(f'{Comment.objects.count()} comments in {args.threads} threads')
+
+        tree, tree_queries = timed(lambda: _with_replies(top_level, args.depth), args.repeat)
+        walk, walk_queries = timed(lambda: walk_responses(top_level, args.depth), args.repeat)
+        print(f'materialized tree:       {tree:8.2f} ms/page, {tree_queries} queries')
+        print(f'level-by-level walk:     {walk:8.2f} ms/page, {walk_queries} queries')
+
+
+if __name__ == '__main__':
+    main()
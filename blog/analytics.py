@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.cache import caches
+from django.utils import timezone
+
+from ai_blog.settings import ANALYTICS_CACHE_ALIAS, ANALYTICS_CACHE_INVALIDATION_TTL
+from .models import CommentDailyStats
+
+
+BUCKET_FIELDS = ('generated_by_ai', 'is_response', 'is_blocked')
+_INVALIDATED = 'invalidated'
+
+
+class DailyStatsCache:
+    """
+    CommentDailyStats buckets per day in the shared cache. Closed days never expire and
+    are only dropped when a comment write touches them; today is always recomputed.
+    """
+
+    def __init__(self, prefix: str, alias='default', invalidation_ttl=60):
+        self.prefix = prefix
+        self.alias = alias
+        self.invalidation_ttl = invalidation_ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recomputes = 0
+        self.recompute_ns = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, day: date) -> str:
+        return f'{self.prefix}:{day.isoformat()}'
+
+    def get_range(self, date_from: date, date_to: date) -> dict[date, dict[tuple, int]]:
+        """
+        {day: {(generated_by_ai, is_response, is_blocked): count}} for every day of the range.
+        """
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        today = timezone.localdate()
+        closed_days = [day for day in days if day < today]
+        cached = self.cache.get_many([self._key(day) for day in closed_days]) if closed_days else {}
+
+        buckets = {}
+        for day in days:
+            value = cached.get(self._key(day))
+            if isinstance(value, dict):
+                buckets[day] = value
+        missing = [day for day in days if day not in buckets]
+
+        recompute_ns = 0
+        if missing:
+            started = time.perf_counter_ns()
+            buckets.update(self._compute(missing))
+            recompute_ns = time.perf_counter_ns() - started
+
+            for day in missing:
+                # `add`, so a day invalidated while it was being recomputed keeps its
+                # tombstone instead of being overwritten with the stale counts.
+                if day < today:
+                    self.cache.add(self._key(day), buckets[day], timeout=None)
+
+        with self._lock:
+            self.hits += len(closed_days) - len([day for day in missing if day < today])
+            self.misses += len(missing)
+            self.recomputes += 1 if missing else 0
+            self.recompute_ns += recompute_ns
+        return buckets
+
+    def _compute(self, days: list[date]) -> dict[date, dict[tuple, int]]:
+        wanted = set(days)
+        buckets = {day: {} for day in days}
+        rows = CommentDailyStats.objects.filter(
+            day__range=(min(days), max(days)), count__gt=0
+        ).values_list('day', *BUCKET_FIELDS, 'count')
+
+        for day, *flags, count in rows:
+            if day in wanted:
+                buckets[day][tuple(flags)] = count
+        return buckets
+
+    def invalidate(self, days):
+        self.cache.set_many(
+            {self._key(day): _INVALIDATED for day in set(days)}, timeout=self.invalidation_ttl
+        )
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.recomputes = self.recompute_ns = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'recomputes': self.recomputes,
+                'avg_recompute_ms': self.recompute_ns / self.recomputes / 1e6 if self.recomputes else 0.0,
+            }
+
+
+daily_stats_cache = DailyStatsCache(
+    prefix = 'analytics:comments-daily',
+    alias = ANALYTICS_CACHE_ALIAS,
+    invalidation_ttl = ANALYTICS_CACHE_INVALIDATION_TTL
+)
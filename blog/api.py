@@ -1,55 +1,237 @@
-from typing import List
-from datetime import date
+from typing import List, Literal, Optional
+from datetime import date, datetime, time, timedelta
+from functools import partial
 
 from ninja_extra import api_controller, route, permissions
-from ninja_jwt.authentication import JWTAuth
+from ninja_extra.pagination import paginate
+from ninja import Query
 from ninja.errors import HttpError
-from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Case, When, QuerySet
-from django.db.models.functions import TruncDay
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from django.db.models import F, Q, Sum, Count, Max, QuerySet, DateField
+from django.db.models.functions import Trunc
+from django.utils import timezone
 from rest_framework.status import (
     HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT,
     HTTP_403_FORBIDDEN
 )
 
-from .models import Post, Comment, CommentResponse
+from ai_blog.settings import CONTENT_CACHE_LOCK_TIMEOUT, ANALYTICS_MAX_RANGE_DAYS
+from user.authentication import CachedJWTAuth, AsyncCachedJWTAuth
+from user.models import User
+from .models import (
+    Post, Comment, CommentResponse, CommentDailyStats, ModerationStatus, VISIBLE_COMMENT, POST_COMMENT_COUNTERS
+)
 from .schemas import (
     PostInputSchema, 
     PostOutputSchema,
     PostUpdateSchema,
+    BulkPostInputSchema,
+    BulkCommentInputSchema,
+    BulkItemResultSchema,
     CommentOutputSchema, 
+    CommentThreadSchema,
     CommentInputSchema,
     CommentDailyBrekadownSchema,
+    CommentBreakdownSchema,
+    ModerationStatusSchema,
+    SearchResultSchema,
+)
+from .pagination import KeysetPagination, CursorPageSchema
+from .streaming import stream_json_array
+from .analytics import daily_stats_cache, BUCKET_FIELDS
+from .content_cache import content_cache, post_cache_key, comment_cache_key, author_cache_key
+from .conditional import not_modified
+from .search import search
+from .helpers import (
+    ai_verify_safety, ai_verify_safety_batch, ai_verify_safety_async, ai_verify_safety_batch_async
 )
-from .helpers import ai_verify_safety
+from .tasks import moderate_post, moderate_posts, moderate_comment, moderate_comments
 from .constants import (
     HARMFUL_CONTENT_ERROR, BLOCKED_COMMENT_ERROR, WRONG_USER_POST_ERROR, 
-    WRONG_USER_COMMENT_ERROR, POST_UPDATE_NO_FIELDS_ERROR
+    WRONG_USER_COMMENT_ERROR, POST_UPDATE_NO_FIELDS_ERROR, BLOCKED_POST_ERROR,
+    PENDING_MODERATION_ERROR, DATE_RANGE_INVERTED_ERROR, DATE_RANGE_TOO_LONG_ERROR,
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_THREAD_DEPTH
 )
 
 
-@api_controller('/blog', auth=JWTAuth(), permissions=[permissions.IsAuthenticated])
+# Columns read by PostOutputSchema/CommentOutputSchema, loaded with the author in one query.
+USER_OUTPUT_FIELDS = ['user__id', 'user__username', 'user__auto_post_reply']
+POST_OUTPUT_FIELDS = [
+    'id', 'title', 'content', 'moderation_status', 'created_at', *POST_COMMENT_COUNTERS, 'last_comment_at',
+    *USER_OUTPUT_FIELDS
+]
+COMMENT_OUTPUT_FIELDS = [
+    'id', 'post_id', 'content', 'moderation_status', 'created_at', 'is_blocked', *USER_OUTPUT_FIELDS
+]
+# Cached payloads keep only the author's id, the author is cached on its own entry
+# (see `_with_author`) so that saving a user drops a single entry.
+POST_PAYLOAD_FIELDS = [
+    'id', 'title', 'content', 'moderation_status', 'created_at', *POST_COMMENT_COUNTERS, 'last_comment_at',
+    'updated_at', 'user_id'
+]
+COMMENT_PAYLOAD_FIELDS = ['id', 'post_id', 'content', 'moderation_status', 'created_at', 'is_blocked', 'user_id']
+AUTHOR_PAYLOAD_FIELDS = ['id', 'username', 'auto_post_reply']
+
+
+def _posts_for_output() -> QuerySet:
+    return Post.objects.select_related('user').only(*POST_OUTPUT_FIELDS)
+
+def _comments_for_output() -> QuerySet:
+    return Comment.objects.select_related('user').only(*COMMENT_OUTPUT_FIELDS)
+
+def _with_replies(top_level: list[Comment], max_depth: int) -> list[dict]:
+    """
+    Nests the visible replies (down to `max_depth`) under their top-level comments, all
+    loaded with one query over `comment_thread_idx`. A hidden reply hides its subtree.
+    """
+    nodes = {comment.id: {**CommentOutputSchema.from_orm(comment).model_dump(), 'depth': 0, 'replies': []}
+             for comment in top_level}
+    replies = _comments_for_output().only(*COMMENT_OUTPUT_FIELDS, 'parent_id', 'depth').filter(
+        root_id__in=list(nodes), depth__lte=max_depth,
+        moderation_status=ModerationStatus.APPROVED, is_blocked=False
+    ).order_by('depth', 'created_at', 'id')
+
+    for reply in replies:
+        parent = nodes.get(reply.parent_id)
+        if parent is None:
+            continue
+        node = {**CommentOutputSchema.from_orm(reply).model_dump(), 'depth': reply.depth, 'replies': []}
+        parent['replies'].append(node)
+        nodes[reply.id] = node
+
+    return [nodes[comment.id] for comment in top_level]
+
+def _load_post_payload(post_id: int) -> dict:
+    # `updated_at` is kept next to the payload for the ETag validator.
+    return get_object_or_404(Post.objects.values(*POST_PAYLOAD_FIELDS), id=post_id)
+
+def _load_comment_payload(comment_id: int) -> dict:
+    # `is_blocked` is not part of the output schema but decides whether the comment is served.
+    return get_object_or_404(Comment.objects.values(*COMMENT_PAYLOAD_FIELDS), id=comment_id)
+
+def _load_author_payload(user_id: int) -> dict:
+    return get_object_or_404(User.objects.values(*AUTHOR_PAYLOAD_FIELDS), id=user_id)
+
+def _with_author(payload: dict) -> dict:
+    author = content_cache.get_or_set(
+        author_cache_key(payload['user_id']), partial(_load_author_payload, payload['user_id']),
+        lock_timeout=CONTENT_CACHE_LOCK_TIMEOUT
+    )
+    return {**payload, 'user': author}
+
+
+@api_controller('/blog', auth=CachedJWTAuth(), permissions=[permissions.IsAuthenticated])
 class BlogController:
     @route.get('/post/{post_id}', response={HTTP_200_OK: PostOutputSchema})
     def retrieve_post(self, request, post_id: int):
-        return get_object_or_404(Post, id=post_id)
+        post = _with_author(content_cache.get_or_set(
+            post_cache_key(post_id), partial(_load_post_payload, post_id), lock_timeout=CONTENT_CACHE_LOCK_TIMEOUT
+        ))
+
+        if post['moderation_status'] == ModerationStatus.PENDING:
+            raise HttpError(HTTP_400_BAD_REQUEST, PENDING_MODERATION_ERROR)
+        if post['moderation_status'] == ModerationStatus.BLOCKED:
+            raise HttpError(HTTP_400_BAD_REQUEST, BLOCKED_POST_ERROR)
+
+        # ETag only: comment counters change without moving any timestamp of the post.
+        counters = [post[counter] for counter in POST_COMMENT_COUNTERS]
+        unchanged = not_modified(
+            request, self.context.response, post['id'], post['updated_at'], post['last_comment_at'], *counters,
+            *post['user'].values()
+        )
+        return unchanged if unchanged is not None else post
 
-    @route.get('/post-list', response={HTTP_200_OK: List[PostOutputSchema]})
+    @route.get('/post-list', response={HTTP_200_OK: CursorPageSchema[PostOutputSchema]})
+    @paginate(KeysetPagination)
     def retrieve_all_posts(self, request):
-        return Post.objects.all()
+        return _posts_for_output().filter(moderation_status=ModerationStatus.APPROVED)
 
-    @route.get('/user/{username}/posts', response={HTTP_200_OK: List[PostOutputSchema]})
+    @route.get('/user/{username}/posts', response={HTTP_200_OK: CursorPageSchema[PostOutputSchema]})
+    @paginate(KeysetPagination)
     def retrieve_user_posts(self, request, username: str):
-        return Post.objects.filter(user__username=username).order_by('-created_at')
+        posts = _posts_for_output().filter(user__username=username, moderation_status=ModerationStatus.APPROVED)
+        version = posts.aggregate(
+            count=Count('id'), latest_id=Max('id'), updated_at=Max('updated_at'), last_comment_at=Max('last_comment_at'),
+            **{counter: Sum(counter) for counter in POST_COMMENT_COUNTERS}
+        )
+
+        # ETag only: deleting or blocking a post does not move any timestamp forward.
+        unchanged = not_modified(request, self.context.response, *version.values())
+        return unchanged if unchanged is not None else posts
     
-    @route.get('/post/{post_id}/comments', response={HTTP_200_OK: List[CommentOutputSchema]})
+    @route.get('/post/{post_id}/comments', response={HTTP_200_OK: CursorPageSchema[CommentOutputSchema]})
+    @paginate(KeysetPagination)
     def retrieve_post_comments(self, request, post_id: int):
-        post = get_object_or_404(Post, id=post_id)
-        return post.comment.all().exclude(Q(is_response=True) | Q(is_blocked=True)).order_by('-created_at')
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        comments = _comments_for_output().filter(VISIBLE_COMMENT, post=post)
+        version = comments.aggregate(count=Count('id'), latest_id=Max('id'), created_at=Max('created_at'))
+
+        # ETag only: deleting or blocking a comment does not move `created_at` forward.
+        unchanged = not_modified(request, self.context.response, *version.values())
+        return unchanged if unchanged is not None else comments
+
+    @route.get('/post/{post_id}/thread', response={HTTP_200_OK: CursorPageSchema[CommentThreadSchema]})
+    def retrieve_post_thread(
+        self, request, post_id: int,
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        max_depth: int = Query(MAX_THREAD_DEPTH, ge=0, le=MAX_THREAD_DEPTH)
+    ):
+        """
+        A page of top-level comments (same cursor as `retrieve_post_comments`) with their
+        nested replies, in three queries however deep or wide the threads are.
+        """
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        page = KeysetPagination().paginate_queryset(
+            _comments_for_output().filter(VISIBLE_COMMENT, post=post),
+            KeysetPagination.Input(cursor=cursor, limit=limit)
+        )
+        return {'items': _with_replies(page['items'], max_depth), 'next_cursor': page['next_cursor']}
+
+    @route.get('/post-list/stream', response={HTTP_200_OK: List[PostOutputSchema]})
+    def stream_all_posts(self, request):
+        posts = _posts_for_output().filter(moderation_status=ModerationStatus.APPROVED)
+        return stream_json_array(posts.order_by('-created_at', '-id'), PostOutputSchema)
+
+    @route.get('/user/{username}/posts/stream', response={HTTP_200_OK: List[PostOutputSchema]})
+    def stream_user_posts(self, request, username: str):
+        posts = _posts_for_output().filter(user__username=username, moderation_status=ModerationStatus.APPROVED)
+        return stream_json_array(posts.order_by('-created_at', '-id'), PostOutputSchema)
+
+    @route.get('/post/{post_id}/comments/stream', response={HTTP_200_OK: List[CommentOutputSchema]})
+    def stream_post_comments(self, request, post_id: int):
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        comments = _comments_for_output().filter(VISIBLE_COMMENT, post=post)
+        return stream_json_array(comments.order_by('-created_at', '-id'), CommentOutputSchema)
+
+    @route.get('/search', response={HTTP_200_OK: CursorPageSchema[SearchResultSchema]})
+    def full_text_search(
+        self, request, q: str = Query(..., min_length=1),
+        kind: Optional[Literal['post', 'comment']] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        return search(q, limit=limit, cursor=cursor, kind=kind)
+
+    @route.get('/post/{post_id}/moderation-status', response={HTTP_200_OK: ModerationStatusSchema})
+    def retrieve_post_moderation_status(self, request, post_id: int):
+        return get_object_or_404(Post.objects.only('id', 'moderation_status'), id=post_id)
 
     @route.post('/create-post', response={HTTP_201_CREATED: PostOutputSchema})
     def create_post(self, request, data: PostInputSchema):
-        if not ai_verify_safety(data.content) or not ai_verify_safety(data.title):
+        if settings.DEFERRED_MODERATION:
+            post = Post.objects.create(
+                user = request.user,
+                title = data.title,
+                content = data.content,
+                moderation_status = ModerationStatus.PENDING
+            )
+            transaction.on_commit(partial(moderate_post.delay, post_id=post.id))
+            return post
+
+        if not all(ai_verify_safety_batch([data.content, data.title])):
             raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
 
         return Post.objects.create(
@@ -58,22 +240,63 @@ class BlogController:
             content = data.content
         )
 
+    @route.post('/bulk/create-posts', response={HTTP_201_CREATED: List[BulkItemResultSchema]})
+    def bulk_create_posts(self, request, data: BulkPostInputSchema):
+        """
+        Up to MAX_BULK_SIZE posts moderated together and stored with one INSERT. As in
+        `create_post`, harmful posts are not stored; their results are `blocked`.
+        """
+        if settings.DEFERRED_MODERATION:
+            verdicts = [None] * len(data.items)
+        else:
+            checks = ai_verify_safety_batch([text for item in data.items for text in (item.content, item.title)])
+            verdicts = [checks[2 * index] and checks[2 * index + 1] for index in range(len(data.items))]
+
+        posts = {
+            index: Post(
+                user = request.user,
+                title = item.title,
+                content = item.content,
+                moderation_status = ModerationStatus.PENDING if is_safe is None else ModerationStatus.APPROVED
+            )
+            for index, (item, is_safe) in enumerate(zip(data.items, verdicts)) if is_safe is not False
+        }
+        with transaction.atomic():
+            Post.objects.bulk_create(posts.values())
+            if settings.DEFERRED_MODERATION and posts:
+                post_ids = [post.id for post in posts.values()]
+                transaction.on_commit(partial(moderate_posts.delay, post_ids=post_ids))
+
+        return [
+            {
+                'index': index,
+                'id': posts[index].id if index in posts else None,
+                'moderation_status': posts[index].moderation_status if index in posts else ModerationStatus.BLOCKED,
+                'blocked': index not in posts
+            }
+            for index in range(len(data.items))
+        ]
+
     @route.patch('/post/{post_id}/update', response={HTTP_200_OK: PostOutputSchema})
     def update_post(self, request, post_id: int, data: PostUpdateSchema):
         if data.title is None and data.content is None:
             raise HttpError(HTTP_400_BAD_REQUEST, POST_UPDATE_NO_FIELDS_ERROR)
 
-        if data.content:
+        if data.content and not settings.DEFERRED_MODERATION:
             if not ai_verify_safety(data.content):
                 raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
 
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post.objects.select_related('user'), id=post_id)
         
         if data.title:
             post.title = data.title
         if data.content:
             post.content = data.content
 
+        if settings.DEFERRED_MODERATION:
+            post.moderation_status = ModerationStatus.PENDING
+            transaction.on_commit(partial(moderate_post.delay, post_id=post.id))
+
         post.save()
         return post
 
@@ -89,14 +312,26 @@ class BlogController:
 
     @route.get('/comment/{comment_id}', response={HTTP_200_OK: CommentOutputSchema})
     def retrieve_comment(self, request, comment_id: int):
-        comment = get_object_or_404(Comment, id=comment_id)
+        comment = _with_author(content_cache.get_or_set(
+            comment_cache_key(comment_id), partial(_load_comment_payload, comment_id),
+            lock_timeout=CONTENT_CACHE_LOCK_TIMEOUT
+        ))
         
-        if comment.is_blocked:
+        if comment['is_blocked']:
             raise HttpError(HTTP_400_BAD_REQUEST, BLOCKED_COMMENT_ERROR)
+        if comment['moderation_status'] == ModerationStatus.PENDING:
+            raise HttpError(HTTP_400_BAD_REQUEST, PENDING_MODERATION_ERROR)
         return comment
 
+    @route.get('/comment/{comment_id}/moderation-status', response={HTTP_200_OK: ModerationStatusSchema})
+    def retrieve_comment_moderation_status(self, request, comment_id: int):
+        return get_object_or_404(Comment.objects.only('id', 'moderation_status'), id=comment_id)
+
     @route.post('/post/{post_id}/create-comment', response={HTTP_201_CREATED: CommentOutputSchema})
     def create_comment(self, request, post_id: int, data: CommentInputSchema):
+        if settings.DEFERRED_MODERATION:
+            return self._create_pending_comment(request.user, data, post_id=post_id)
+
         is_blocked = not ai_verify_safety(data.content)
         comment = self._create_comment(request.user, data, post_id=post_id, is_blocked=is_blocked)
 
@@ -104,11 +339,63 @@ class BlogController:
             raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
         return comment
 
+    @route.post('/post/{post_id}/bulk/create-comments', response={HTTP_201_CREATED: List[BulkItemResultSchema]})
+    def bulk_create_comments(self, request, post_id: int, data: BulkCommentInputSchema):
+        """
+        Up to MAX_BULK_SIZE comments moderated together and stored with one INSERT. As in
+        `create_comment`, harmful comments are stored blocked and reported as `blocked`.
+        """
+        post = get_object_or_404(Post.objects.only('id'), id=post_id)
+        if settings.DEFERRED_MODERATION:
+            verdicts = [None] * len(data.items)
+        else:
+            verdicts = ai_verify_safety_batch([item.content for item in data.items])
+
+        comments = []
+        for item, is_safe in zip(data.items, verdicts):
+            comment = Comment(
+                user = request.user,
+                post = post,
+                content = item.content,
+                is_blocked = is_safe is False,
+                moderation_status = ModerationStatus.PENDING if is_safe is None
+                    else ModerationStatus.APPROVED if is_safe else ModerationStatus.BLOCKED
+            )
+            # bulk_create bypasses Comment.save, which is where auto replies are scheduled.
+            comment._schedule_auto_reply()
+            comments.append(comment)
+
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            if settings.DEFERRED_MODERATION:
+                comment_ids = [comment.id for comment in comments]
+                transaction.on_commit(partial(moderate_comments.delay, comment_ids=comment_ids))
+
+        return [
+            {
+                'index': index,
+                'id': comment.id,
+                'moderation_status': comment.moderation_status,
+                'blocked': comment.is_blocked
+            }
+            for index, comment in enumerate(comments)
+        ]
+
     @route.post('post/{post_id}/comment/{comment_id}/reply', response={HTTP_201_CREATED: CommentOutputSchema})
     def reply_to_comment(self, request, post_id: int, comment_id: int, data: CommentInputSchema):
+        if settings.DEFERRED_MODERATION:
+            comment = get_object_or_404(Comment, id=comment_id)
+            response = self._create_pending_comment(
+                request.user, data, post_id=post_id, is_response=True, **comment.reply_thread_fields()
+            )
+            CommentResponse.objects.create(comment=comment, response=response)
+            return response
+
         is_blocked = not ai_verify_safety(data.content)
         comment = get_object_or_404(Comment, id=comment_id)
-        response = self._create_comment(request.user, data, post_id=post_id, is_response=True, is_blocked=is_blocked)
+        response = self._create_comment(
+            request.user, data, post_id=post_id, is_response=True, is_blocked=is_blocked, **comment.reply_thread_fields()
+        )
         CommentResponse.objects.create(comment=comment, response=response)
 
         if is_blocked:
@@ -126,56 +413,201 @@ class BlogController:
         comment.delete()
         return HTTP_204_NO_CONTENT
 
-    def _create_comment(self, user, data: CommentInputSchema, post_id, **kwargs):
+    def _create_comment(self, user, data: CommentInputSchema, post_id, is_blocked=False, **kwargs):
+        kwargs.setdefault('moderation_status', ModerationStatus.BLOCKED if is_blocked else ModerationStatus.APPROVED)
         return Comment.objects.create(
             user = user,
             post = get_object_or_404(Post, id=post_id),
             content = data.content,
+            is_blocked = is_blocked,
             **kwargs
         )
 
+    def _create_pending_comment(self, user, data: CommentInputSchema, post_id, **kwargs):
+        comment = self._create_comment(user, data, post_id, moderation_status=ModerationStatus.PENDING, **kwargs)
+        transaction.on_commit(partial(moderate_comment.delay, comment_id=comment.id))
+        return comment
 
-@api_controller('/blog/analytics', auth=JWTAuth(), permissions=[permissions.IsAuthenticated])
+
+@api_controller('/blog/async', auth=AsyncCachedJWTAuth(), permissions=[permissions.IsAuthenticated])
+class AsyncBlogController:
+    """
+    Non-blocking versions of the write endpoints for ASGI deployments (`ai_blog.asgi`).
+    Moderation awaits the async Gemini client, so a worker is not held per request.
+    """
+    @route.post('/create-post', response={HTTP_201_CREATED: PostOutputSchema})
+    async def create_post(self, request, data: PostInputSchema):
+        if not all(await ai_verify_safety_batch_async([data.content, data.title])):
+            raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
+
+        return await Post.objects.acreate(
+            user = request.user,
+            title = data.title,
+            content = data.content
+        )
+
+    @route.patch('/post/{post_id}/update', response={HTTP_200_OK: PostOutputSchema})
+    async def update_post(self, request, post_id: int, data: PostUpdateSchema):
+        if data.title is None and data.content is None:
+            raise HttpError(HTTP_400_BAD_REQUEST, POST_UPDATE_NO_FIELDS_ERROR)
+
+        if data.content:
+            if not await ai_verify_safety_async(data.content):
+                raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
+
+        post = await aget_object_or_404(Post.objects.select_related('user'), id=post_id)
+
+        if data.title:
+            post.title = data.title
+        if data.content:
+            post.content = data.content
+
+        await post.asave()
+        return post
+
+    @route.delete('/post/{post_id}/delete')
+    async def delete_post(self, request, post_id: int):
+        post = await aget_object_or_404(Post, id=post_id)
+
+        if post.user_id != request.user.id:
+            raise HttpError(HTTP_403_FORBIDDEN, WRONG_USER_POST_ERROR)
+
+        await post.adelete()
+        return HTTP_204_NO_CONTENT
+
+    @route.post('/post/{post_id}/create-comment', response={HTTP_201_CREATED: CommentOutputSchema})
+    async def create_comment(self, request, post_id: int, data: CommentInputSchema):
+        is_blocked = not await ai_verify_safety_async(data.content)
+        comment = await self._create_comment(request.user, data, post_id=post_id, is_blocked=is_blocked)
+
+        if is_blocked:
+            raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
+        return comment
+
+    @route.post('post/{post_id}/comment/{comment_id}/reply', response={HTTP_201_CREATED: CommentOutputSchema})
+    async def reply_to_comment(self, request, post_id: int, comment_id: int, data: CommentInputSchema):
+        is_blocked = not await ai_verify_safety_async(data.content)
+        comment = await aget_object_or_404(Comment, id=comment_id)
+        response = await self._create_comment(
+            request.user, data, post_id=post_id, is_response=True, is_blocked=is_blocked,
+            **comment.reply_thread_fields()
+        )
+        await CommentResponse.objects.acreate(comment=comment, response=response)
+
+        if is_blocked:
+            raise HttpError(HTTP_400_BAD_REQUEST, HARMFUL_CONTENT_ERROR)
+        return response
+
+    @route.delete('post/{post_id}/comment/{comment_id}')
+    async def delete_comment(self, request, post_id: int, comment_id: int):
+        comment = await aget_object_or_404(Comment, id=comment_id)
+        post = await aget_object_or_404(Post, id=post_id)
+
+        if comment.user_id != request.user.id and post.user_id != request.user.id:
+            raise HttpError(HTTP_403_FORBIDDEN, WRONG_USER_COMMENT_ERROR)
+
+        await comment.adelete()
+        return HTTP_204_NO_CONTENT
+
+    async def _create_comment(self, user, data: CommentInputSchema, post_id, is_blocked=False, **kwargs):
+        return await Comment.objects.acreate(
+            user = user,
+            post = await aget_object_or_404(Post, id=post_id),
+            content = data.content,
+            is_blocked = is_blocked,
+            moderation_status = ModerationStatus.BLOCKED if is_blocked else ModerationStatus.APPROVED,
+            **kwargs
+        )
+
+
+# Counted by `comments_breakdown` for each period, None meaning every comment.
+BREAKDOWN_FACETS = {
+    'total_comments': None,
+    'blocked_comments': Q(is_blocked=True),
+    'published_comments': Q(is_blocked=False),
+    'ai_comments': Q(generated_by_ai=True),
+    'human_comments': Q(generated_by_ai=False),
+    'non_response_comments': Q(is_response=False),
+}
+
+
+def _check_date_range(date_from: date, date_to: date):
+    if date_from > date_to:
+        raise HttpError(HTTP_400_BAD_REQUEST, DATE_RANGE_INVERTED_ERROR)
+    if (date_to - date_from).days + 1 > ANALYTICS_MAX_RANGE_DAYS:
+        raise HttpError(HTTP_400_BAD_REQUEST, DATE_RANGE_TOO_LONG_ERROR.format(ANALYTICS_MAX_RANGE_DAYS))
+
+
+@api_controller('/blog/analytics', auth=CachedJWTAuth(), permissions=[permissions.IsAuthenticated])
 class BlogAnalyticsController:
     @route.get('/comments-daily-breakdown', response={HTTP_200_OK: List[CommentDailyBrekadownSchema]})
     def comments_daily_breakdown(self, request, date_from: date, date_to: date):
-        query = Comment.objects.all()
-        return self._aggregate_comments_daily(query, date_from, date_to)
+        return self._aggregate_comments_daily(date_from, date_to)
 
     @route.get('/comments-daily-breakdown/exclude-responses', response={HTTP_200_OK: List[CommentDailyBrekadownSchema]})
     def comments_daily_breakdown_excluding_responses(self, request, date_from: date, date_to: date):
-        responses = CommentResponse.objects.values_list('response__id', flat=True)
-        query = Comment.objects.all().exclude(id__in=responses)
-        return self._aggregate_comments_daily(query, date_from, date_to)
+        return self._aggregate_comments_daily(date_from, date_to, is_response=False)
 
     @route.get('/comments-daily-breakdown/exclude-ai', response={HTTP_200_OK: List[CommentDailyBrekadownSchema]})
     def comments_daily_breakdown_excluding_ai(self, request, date_from: date, date_to: date):
-        query = Comment.objects.all().exclude(generated_by_ai=True)
-        return self._aggregate_comments_daily(query, date_from, date_to)
+        return self._aggregate_comments_daily(date_from, date_to, generated_by_ai=False)
 
     @route.get('/comments-daily-breakdown/ai-only', response={HTTP_200_OK: List[CommentDailyBrekadownSchema]})
     def comments_daily_breakdown_ai_only(self, request, date_from: date, date_to: date):
-        query = Comment.objects.filter(generated_by_ai=True)
-        return self._aggregate_comments_daily(query, date_from, date_to)
-
-    def _aggregate_comments_daily(self, query: QuerySet, date_from: date, date_to: date):
-        aggregated_comments = query.filter(
-            created_at__range=(date_from, date_to)
-        ).annotate(
-            day=TruncDay('created_at')
-        ).values('day').annotate(
-            total_comments = Count('id'),
-            blocked_count = Count(Case(When(is_blocked=True, then=1))),
-            published_comments = Count(Case(When(is_blocked=False, then=1)))
-        ).order_by('day')
-
+        return self._aggregate_comments_daily(date_from, date_to, generated_by_ai=True)
+
+    @route.get('/comments-breakdown', response={HTTP_200_OK: List[CommentBreakdownSchema]})
+    def comments_breakdown(
+        self, request, date_from: date, date_to: date,
+        granularity: Literal['hour', 'day', 'week', 'month'] = 'day',
+        group_by: Optional[Literal['post', 'user']] = None
+    ):
+        """
+        Every comment facet per period in a single grouped query. Daily and coarser totals
+        come from the CommentDailyStats rollup, hourly or per post/author ones from Comment.
+        """
+        _check_date_range(date_from, date_to)
+        if granularity != 'hour' and group_by is None:
+            query = CommentDailyStats.objects.filter(day__range=(date_from, date_to)).annotate(
+                period = F('day') if granularity == 'day' else Trunc('day', granularity, output_field=DateField())
+            )
+            measures = {
+                name: Sum('count', filter=condition, default=0) for name, condition in BREAKDOWN_FACETS.items()
+            }
+            dimensions = ['period']
+        else:
+            current_timezone = timezone.get_current_timezone()
+            query = Comment.objects.filter(
+                created_at__gte = datetime.combine(date_from, time.min, tzinfo=current_timezone),
+                created_at__lt = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=current_timezone)
+            ).annotate(
+                period = Trunc('created_at', granularity) if granularity == 'hour'
+                    else Trunc('created_at', granularity, output_field=DateField())
+            )
+            measures = {name: Count('id', filter=condition) for name, condition in BREAKDOWN_FACETS.items()}
+            dimensions = ['period'] if group_by is None else ['period', f'{group_by}_id']
+
+        return query.values(*dimensions).annotate(**measures).filter(total_comments__gt=0).order_by(*dimensions)
+
+    def _aggregate_comments_daily(self, date_from: date, date_to: date, **flags):
+        _check_date_range(date_from, date_to)
+        # Past days come from `daily_stats_cache`, only the missing ones (and today) hit the rollup.
         daily_breakdown = []
-        for entry in aggregated_comments:
-            daily_breakdown.append({
-                'day': entry['day'],
-                'total_comments': entry['total_comments'],
-                'blocked_comments': entry['blocked_count'],
-                'published_comments': entry['published_comments']
-            })
+        for day, buckets in sorted(daily_stats_cache.get_range(date_from, date_to).items()):
+            total_comments = blocked_comments = 0
+            for bucket, count in buckets.items():
+                bucket = dict(zip(BUCKET_FIELDS, bucket))
+                if any(bucket[field] != value for field, value in flags.items()):
+                    continue
+                total_comments += count
+                blocked_comments += count if bucket['is_blocked'] else 0
+
+            if total_comments:
+                daily_breakdown.append({
+                    'day': day,
+                    'total_comments': total_comments,
+                    'blocked_comments': blocked_comments,
+                    'published_comments': total_comments - blocked_comments
+                })
 
         return daily_breakdown
@@ -0,0 +1,81 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesces items submitted from concurrent threads within a short window into a
+    single call of `handler`, then fans the results back out to the callers.
+
+    `handler` receives a dict of key -> item and must return a dict with a result for
+    every key. Items sharing a key inside one window are handled once.
+    """
+
+    def __init__(self, handler, window: float, max_size: int):
+        self.handler = handler
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, key, item) -> Future:
+        future = Future()
+        with self._lock:
+            self._ensure_worker()
+            self._queue.put((key, item, future))
+        return future
+
+    def process(self, items: dict) -> dict:
+        futures = {key: self.submit(key, item) for key, item in items.items()}
+        return {key: future.result() for key, future in futures.items()}
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork (gunicorn/celery prefork), so it is
+        # started lazily in every process that actually submits work.
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker_pid = os.getpid()
+        self._worker.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            self._flush(self._collect())
+
+    def _flush(self, batch: list):
+        items = {key: item for key, item, _ in batch}
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = self.handler(items)
+        except Exception as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+            return
+
+        for key, _, future in batch:
+            future.set_result(results[key])
@@ -0,0 +1,24 @@
+import hashlib
+from typing import Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+
+
+def make_etag(request: HttpRequest, *version) -> str:
+    # The query string is part of the tag: a different cursor or limit is a different page.
+    digest = hashlib.sha1(repr((version, request.GET.urlencode())).encode()).hexdigest()
+    return quote_etag(digest)
+
+def not_modified(request: HttpRequest, response: HttpResponse, *version) -> Optional[HttpResponse]:
+    """
+    Puts an ETag built from `version` on `response` (the controller's temporal response)
+    and returns a 304 when If-None-Match already matches it.
+    """
+    etag = make_etag(request, *version)
+
+    conditional = get_conditional_response(request, etag=etag)
+    for target in (response, conditional):
+        if target is not None:
+            target.headers['ETag'] = etag
+    return conditional
@@ -1,10 +1,24 @@
 MAX_COMMENT_LENGTH = 512
 MAX_AI_RESPONSE_LENGTH = 256
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 500
+MAX_BULK_SIZE = 100
+MAX_THREAD_DEPTH = 32
+
 HARMFUL_CONTENT_ERROR = 'Provided content was considered as harmful and was blocked.'
 BLOCKED_COMMENT_ERROR = 'The comment you are trying to recieve was blocked due to safery reasons.'
+BLOCKED_POST_ERROR = 'The post you are trying to receive was blocked due to safety reasons.'
+PENDING_MODERATION_ERROR = 'The content you are trying to receive is still being moderated.'
+AI_SERVICE_BUSY_ERROR = 'The AI service is busy, please try again later.'
 
 WRONG_USER_POST_ERROR = 'You are not the author of the post.'
 WRONG_USER_COMMENT_ERROR = 'You are not the author of the post nor the author of the comment.'
 
 POST_UPDATE_NO_FIELDS_ERROR = 'At least one field must be provided.'
+
+DATE_RANGE_INVERTED_ERROR = '`date_from` must not be after `date_to`.'
+DATE_RANGE_TOO_LONG_ERROR = 'The date range cannot span more than {} days.'
+
+INVALID_CURSOR_ERROR = 'Provided cursor is invalid.'
@@ -0,0 +1,21 @@
+from ai_blog.cache import TieredCache
+from ai_blog.settings import CONTENT_CACHE_ALIAS, CONTENT_CACHE_SIZE, CONTENT_CACHE_LOCAL_TTL, CONTENT_CACHE_TTL
+
+
+content_cache = TieredCache(
+    prefix = 'content',
+    maxsize = CONTENT_CACHE_SIZE,
+    local_ttl = CONTENT_CACHE_LOCAL_TTL,
+    shared_ttl = CONTENT_CACHE_TTL,
+    alias = CONTENT_CACHE_ALIAS
+)
+
+
+def post_cache_key(post_id: int) -> str:
+    return f'post:{post_id}'
+
+def comment_cache_key(comment_id: int) -> str:
+    return f'comment:{comment_id}'
+
+def author_cache_key(user_id: int) -> str:
+    return f'author:{user_id}'
@@ -1,27 +1,173 @@
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from google.generativeai.protos import Candidate
+import asyncio
+import hashlib
+import unicodedata
 
-from ai_blog.gemini import ai_model
+from ai_blog.ai import get_ai_provider
+from ai_blog.cache import TieredCache
+from ai_blog.settings import (
+    MODERATION_CACHE_ALIAS, MODERATION_CACHE_SIZE, MODERATION_CACHE_LOCAL_TTL, MODERATION_CACHE_TTL,
+    MODERATION_BATCH_WINDOW_MS, MODERATION_BATCH_MAX_SIZE, MODERATION_PREFILTER_ENABLED,
+    MODERATION_PREFILTER_BLOCKLIST, MODERATION_PREFILTER_ALLOWLIST
+)
 
+from .batching import MicroBatcher
+from .prefilter import LexicalPrefilter
 from .constants import MAX_AI_RESPONSE_LENGTH
 
 
+verdict_cache = TieredCache(
+    prefix = 'moderation',
+    maxsize = MODERATION_CACHE_SIZE,
+    local_ttl = MODERATION_CACHE_LOCAL_TTL,
+    shared_ttl = MODERATION_CACHE_TTL,
+    alias = MODERATION_CACHE_ALIAS
+)
+
+prefilter = LexicalPrefilter(
+    blocklist = MODERATION_PREFILTER_BLOCKLIST,
+    allowlist = MODERATION_PREFILTER_ALLOWLIST
+) if MODERATION_PREFILTER_ENABLED else None
+
+
+def verdict_cache_key(content: str, profile: str = None) -> str:
+    """
+    Cache key for a moderation verdict: hash of the normalized text (NFKC, casefolded,
+    whitespace collapsed) plus the moderation profile (model, safety settings) of the
+    provider it was checked with.
+    """
+    if profile is None:
+        profile = get_ai_provider().moderation_profile
+    normalized = ' '.join(unicodedata.normalize('NFKC', content).casefold().split())
+    digest = hashlib.sha256(f'{profile}\n{normalized}'.encode()).hexdigest()
+    return digest
+
+def _reply_prompt(content: str) -> str:
+    return f'Reply to this comment using less than {MAX_AI_RESPONSE_LENGTH} symbols: {content}'
+
 def get_ai_response(content: str) -> str:
-    return ai_model.generate_content(
-        f'Reply to this comment using less than {MAX_AI_RESPONSE_LENGTH} symbols: {content}'
-    ).text
+    return get_ai_provider().reply(_reply_prompt(content))
 
-def ai_verify_safety(content: str) -> bool:
-    response = ai_model.generate_content(
-        f'Is this text save to public: {content}',
-        safety_settings= {
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_LOW_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_LOW_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_LOW_AND_ABOVE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_LOW_AND_ABOVE
-        }
+async def get_ai_response_async(content: str) -> str:
+    return await get_ai_provider().areply(_reply_prompt(content))
+
+def _verdict_prompt(contents: list[str]) -> str:
+    if len(contents) == 1:
+        return f'Is this text save to public: {contents[0]}'
+
+    numbered = '\n'.join(f'{number}. {content}' for number, content in enumerate(contents, start=1))
+    return f'Are these texts save to public:\n{numbered}'
+
+def _request_verdict(contents: list[str]) -> bool:
+    """
+    Single model call for all `contents`. True when none of them tripped the safety filter.
+    """
+    return get_ai_provider().is_safe(_verdict_prompt(contents))
+
+async def _request_verdict_async(contents: list[str]) -> bool:
+    return await get_ai_provider().ais_safe(_verdict_prompt(contents))
+
+def _verify_group(contents: list[str]) -> list[bool]:
+    # Safe texts are the common case, so the whole group is checked at once and only
+    # a blocked group is split in halves to find the offending texts.
+    if _request_verdict(contents):
+        return [True] * len(contents)
+    if len(contents) == 1:
+        return [False]
+
+    middle = len(contents) // 2
+    return _verify_group(contents[:middle]) + _verify_group(contents[middle:])
+
+async def _verify_group_async(contents: list[str]) -> list[bool]:
+    if await _request_verdict_async(contents):
+        return [True] * len(contents)
+    if len(contents) == 1:
+        return [False]
+
+    middle = len(contents) // 2
+    first_half, second_half = await asyncio.gather(
+        _verify_group_async(contents[:middle]),
+        _verify_group_async(contents[middle:])
     )
+    return first_half + second_half
+
+def _prefilter_verdict(content: str):
+    return prefilter.check(content) if prefilter is not None else None
+
+def _moderate_uncached(items: dict[str, str]) -> dict[str, bool]:
+    verdicts = dict(zip(items, _verify_group(list(items.values()))))
+    for key, is_safe in verdicts.items():
+        verdict_cache.set(key, is_safe)
+    return verdicts
+
+
+moderation_batcher = MicroBatcher(
+    handler = _moderate_uncached,
+    window = MODERATION_BATCH_WINDOW_MS / 1000,
+    max_size = MODERATION_BATCH_MAX_SIZE
+) if MODERATION_BATCH_WINDOW_MS else None
+
+
+def ai_verify_safety_batch(contents: list[str]) -> list[bool]:
+    """
+    Verdicts for several texts using as few model calls as possible: texts resolved by
+    the lexical prefilter or the cache are skipped, duplicates are checked once and the
+    rest share one request (or are coalesced with concurrent requests when the
+    micro-batcher is enabled).
+    """
+    keys = [verdict_cache_key(content) for content in contents]
+    verdicts = {}
+    pending = {}
+
+    for key, content in zip(keys, contents):
+        if key in verdicts or key in pending:
+            continue
+        is_safe = _prefilter_verdict(content)
+        if is_safe is None:
+            is_safe = verdict_cache.get(key)
+        if is_safe is None:
+            pending[key] = content
+        else:
+            verdicts[key] = is_safe
+
+    if pending:
+        if moderation_batcher is not None:
+            verdicts.update(moderation_batcher.process(pending))
+        else:
+            verdicts.update(_moderate_uncached(pending))
+
+    return [verdicts[key] for key in keys]
+
+def ai_verify_safety(content: str) -> bool:
+    return ai_verify_safety_batch([content])[0]
+
+async def ai_verify_safety_batch_async(contents: list[str]) -> list[bool]:
+    """
+    Non-blocking `ai_verify_safety_batch` for the async controllers.
+    """
+    keys = [verdict_cache_key(content) for content in contents]
+    verdicts = {}
+    pending = {}
+
+    for key, content in zip(keys, contents):
+        if key in verdicts or key in pending:
+            continue
+        is_safe = _prefilter_verdict(content)
+        if is_safe is None:
+            is_safe = await verdict_cache.aget(key)
+        if is_safe is None:
+            pending[key] = content
+        else:
+            verdicts[key] = is_safe
+
+    if pending and moderation_batcher is not None:
+        futures = [asyncio.wrap_future(moderation_batcher.submit(key, content)) for key, content in pending.items()]
+        verdicts.update(zip(pending, await asyncio.gather(*futures)))
+    elif pending:
+        for key, is_safe in zip(pending, await _verify_group_async(list(pending.values()))):
+            await verdict_cache.aset(key, is_safe)
+            verdicts[key] = is_safe
+
+    return [verdicts[key] for key in keys]
 
-    if response.candidates[0].finish_reason == Candidate.FinishReason.SAFETY:
-        return False
-    return True
+async def ai_verify_safety_async(content: str) -> bool:
+    return (await ai_verify_safety_batch_async([content]))[0]
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_celery_beat.models import PeriodicTask, PeriodicTasks
+
+from blog.models import Comment
+
+
+# Task of the one-off PeriodicTask rows that scheduled auto replies before `dispatch_due_replies`.
+LEGACY_REPLY_TASK = 'blog.tasks.auto_comment_response'
+
+
+class Command(BaseCommand):
+    help = (
+        'Run once before starting the beat that schedules dispatch_due_replies: marks the auto replies '
+        'scheduled before it as dispatched and hands the ones still waiting on a legacy PeriodicTask '
+        'over to the sweeper.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=parse_datetime, default=None,
+            help='only comments due before this ISO datetime are marked (default: now)'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        before = options['before'] or now
+
+        with transaction.atomic():
+            legacy = PeriodicTask.objects.select_for_update().filter(task=LEGACY_REPLY_TASK, enabled=True)
+            waiting = [json.loads(kwargs or '{}').get('comment_id') for kwargs in legacy.values_list('kwargs', flat=True)]
+            waiting = [comment_id for comment_id in waiting if comment_id is not None]
+            disabled = legacy.update(enabled=False)
+
+            # Already answered (or abandoned) by the legacy tasks.
+            marked = Comment.objects.filter(
+                respond_at__lte=before, reply_dispatched_at__isnull=True
+            ).exclude(id__in=waiting).update(reply_dispatched_at=now)
+
+            # Not answered yet: their task is disabled, so the sweeper sends the reply instead.
+            for start in range(0, len(waiting), options['batch_size']):
+                Comment.objects.filter(id__in=waiting[start:start + options['batch_size']]).update(
+                    reply_dispatched_at=None, respond_at=Coalesce('respond_at', now)
+                )
+
+        if disabled:
+            # Bulk updates do not bump the beat's change marker.
+            PeriodicTasks.update_changed()
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {marked} auto replies as dispatched, handed {len(waiting)} over from {disabled} '
+            f'legacy periodic tasks.'
+        ))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from blog.models import Comment, CommentDailyStats, comment_stats_changed
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the CommentDailyStats rollup from the Comment table (backfill or drift repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', type=date.fromisoformat, help='first day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=date.fromisoformat, help='last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        stats = CommentDailyStats.objects.all()
+        comments = Comment.objects.annotate(day=TruncDate('created_at'))
+
+        if options['date_from']:
+            stats = stats.filter(day__gte=options['date_from'])
+            comments = comments.filter(day__gte=options['date_from'])
+        if options['date_to']:
+            stats = stats.filter(day__lte=options['date_to'])
+            comments = comments.filter(day__lte=options['date_to'])
+
+        rows = comments.values('day', 'generated_by_ai', 'is_response', 'is_blocked').annotate(count=Count('id'))
+
+        with transaction.atomic():
+            days = set(stats.values_list('day', flat=True))
+            stats.delete()
+            created = CommentDailyStats.objects.bulk_create(
+                (CommentDailyStats(**row) for row in rows.order_by()), batch_size=1000
+            )
+            days.update(row.day for row in created)
+            transaction.on_commit(lambda: comment_stats_changed.send(sender=CommentDailyStats, days=days))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(created)} comment stats rows.'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Comment, CommentResponse
+
+
+class Command(BaseCommand):
+    help = 'Backfills Comment.parent/root/depth from the CommentResponse links.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        parents = dict(CommentResponse.objects.values_list('response_id', 'comment_id'))
+        current = {
+            comment_id: (parent_id, root_id, depth)
+            for comment_id, parent_id, root_id, depth in Comment.objects.values_list('id', 'parent_id', 'root_id', 'depth')
+        }
+
+        tree = {}
+        def place(comment_id):
+            # (root, depth) of a comment: walk up to a placed or top-level ancestor, then back down.
+            chain = []
+            while comment_id not in tree:
+                parent_id = parents.get(comment_id)
+                if parent_id is None or parent_id not in current or parent_id in chain or parent_id == comment_id:
+                    tree[comment_id] = (None, 0)
+                    break
+                chain.append(comment_id)
+                comment_id = parent_id
+            for child_id in reversed(chain):
+                parent_id = parents[child_id]
+                parent_root, parent_depth = tree[parent_id]
+                tree[child_id] = (parent_root or parent_id, parent_depth + 1)
+            return tree[chain[0]] if chain else tree[comment_id]
+
+        changed = []
+        for comment_id, (parent_id, root_id, depth) in current.items():
+            new_parent = parents.get(comment_id) if parents.get(comment_id) in current else None
+            new_root, new_depth = place(comment_id)
+            if (parent_id, root_id, depth) != (new_parent, new_root, new_depth):
+                changed.append(Comment(id=comment_id, parent_id=new_parent, root_id=new_root, depth=new_depth))
+
+        with transaction.atomic():
+            Comment.objects.bulk_update(changed, ['parent', 'root', 'depth'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(changed)} of {len(current)} comments.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.search import is_supported, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Drops and rebuilds the full-text search index (FTS5 table and triggers) from posts and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if not is_supported(options['database']):
+            raise CommandError('Full-text search is only available on SQLite.')
+
+        with transaction.atomic(using=options['database']):
+            indexed = rebuild_search_index(options['database'])
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} posts and comments.'))
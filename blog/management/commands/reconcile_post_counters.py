@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from blog.models import Post, ModerationStatus, POST_COMMENT_COUNTERS, post_counters_changed
+
+
+# Same definitions as `Comment.counter_key()`, over the `comment` relation of Post.
+PUBLISHED = Q(comment__moderation_status=ModerationStatus.APPROVED, comment__is_blocked=False)
+COUNTED = {
+    'comment_count': Count('comment', filter=PUBLISHED),
+    'blocked_comment_count': Count('comment', filter=Q(comment__is_blocked=True)),
+    'ai_reply_count': Count('comment', filter=PUBLISHED & Q(comment__generated_by_ai=True, comment__is_response=True)),
+    'last_comment_at': Max('comment__created_at', filter=PUBLISHED),
+}
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized comment counters of posts and repairs the ones that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fields = [*POST_COMMENT_COUNTERS, 'last_comment_at']
+        posts = Post.objects.only('id', *fields).annotate(
+            **{f'actual_{field}': aggregate for field, aggregate in COUNTED.items()}
+        ).order_by('id')
+
+        checked, repaired, last_id = 0, [], 0
+        while True:
+            # Read and write each batch in one transaction so concurrent F() updates are not lost.
+            with transaction.atomic():
+                batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+
+                drifted = []
+                for post in batch:
+                    actual = {field: getattr(post, f'actual_{field}') for field in fields}
+                    if any(getattr(post, field) != value for field, value in actual.items()):
+                        for field, value in actual.items():
+                            setattr(post, field, value)
+                        drifted.append(post)
+                Post.objects.bulk_update(drifted, fields)
+
+            checked += len(batch)
+            repaired.extend(post.id for post in drifted)
+            last_id = batch[-1].id
+
+        if repaired:
+            post_counters_changed.send(sender=Post, post_ids=set(repaired))
+        self.stdout.write(self.style.SUCCESS(f'Repaired the comment counters of {len(repaired)} of {checked} posts.'))
@@ -1,65 +1,294 @@
-import json
+from collections import Counter
 from datetime import timedelta
 
-from django.db import models
-from django_celery_beat.models import CrontabSchedule, PeriodicTask
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import Signal
+from django.utils import timezone
 
 from ai_blog.settings import AUTH_USER_MODEL
 from .constants import MAX_COMMENT_LENGTH
 
 
+class ModerationStatus(models.TextChoices):
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    BLOCKED = 'blocked'
+
+
+# Comments listed under a post. Also the condition of the partial `comment_visible_feed_idx`:
+# queries must use this exact Q for SQLite to pick the index.
+VISIBLE_COMMENT = models.Q(moderation_status=ModerationStatus.APPROVED, is_response=False, is_blocked=False)
+
+
+# Post columns counting its comments, in the order of `Comment.counter_key()` flags.
+POST_COMMENT_COUNTERS = ('comment_count', 'blocked_comment_count', 'ai_reply_count')
+
+# Sent with `post_ids` whenever the comment counters of those posts changed.
+post_counters_changed = Signal()
+
+
+class PostManager(models.Manager):
+    def apply_comment_counters(self, deltas: Counter, last_comment_at: dict = None):
+        """
+        Adds `deltas` ({(post_id, counter): change}) to the posts' comment counters with
+        atomic F() updates and moves `last_comment_at` ({post_id: datetime}) forward.
+        Decrements stop at 0, so a counter that drifted low cannot break deletes.
+        """
+        last_comment_at = last_comment_at or {}
+        changes = {post_id: {} for post_id in last_comment_at}
+        for (post_id, counter), delta in deltas.items():
+            if delta > 0:
+                changes.setdefault(post_id, {})[counter] = F(counter) + delta
+            elif delta < 0:
+                changes.setdefault(post_id, {})[counter] = Greatest(F(counter) + delta, Value(0))
+
+        for post_id, at in last_comment_at.items():
+            changes[post_id]['last_comment_at'] = Coalesce(Greatest('last_comment_at', Value(at)), Value(at))
+        for post_id, fields in changes.items():
+            self.filter(id=post_id).update(**fields)
+
+        if changes:
+            post_counters_changed.send(sender=Post, post_ids=set(changes))
+
+
 class Post(models.Model):
     title = models.CharField(max_length=128, db_index=True)
     content = models.TextField()
     user = models.ForeignKey(AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=True)
+    moderation_status = models.CharField(
+        max_length=16, choices=ModerationStatus, default=ModerationStatus.APPROVED, db_index=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from Comment, see `Comment.counter_key()`; `reconcile_post_counters` repairs
+    # drift. `last_comment_at` is not moved back when the latest comment is deleted.
+    comment_count = models.PositiveIntegerField(default=0)
+    blocked_comment_count = models.PositiveIntegerField(default=0)
+    ai_reply_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
+
+    objects = PostManager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of `retrieve_all_posts` and `retrieve_user_posts`.
+            models.Index(fields=['moderation_status', '-created_at', '-id'], name='post_feed_idx'),
+            models.Index(fields=['user', 'moderation_status', '-created_at', '-id'], name='post_user_feed_idx'),
+        ]
     
     def __str__(self):
         return self.title
 
 
+# Sent after commit with `days`, the set of days whose CommentDailyStats rows changed.
+comment_stats_changed = Signal()
+
+
+class CommentDailyStatsManager(models.Manager):
+    def apply(self, deltas: Counter):
+        """
+        Adds `deltas` ({(day, generated_by_ai, is_response, is_blocked): change}) to the
+        rollup with atomic F() updates, creating missing rows.
+        """
+        for (day, generated_by_ai, is_response, is_blocked), delta in deltas.items():
+            if not delta:
+                continue
+
+            bucket = self.filter(
+                day=day, generated_by_ai=generated_by_ai, is_response=is_response, is_blocked=is_blocked
+            )
+            if bucket.update(count=F('count') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    self.create(
+                        day=day, generated_by_ai=generated_by_ai, is_response=is_response,
+                        is_blocked=is_blocked, count=delta
+                    )
+            except IntegrityError:
+                bucket.update(count=F('count') + delta)
+
+        days = {day for (day, *_), delta in deltas.items() if delta}
+        if days:
+            transaction.on_commit(
+                lambda: comment_stats_changed.send(sender=CommentDailyStats, days=days), using=self.db
+            )
+
+
+class CommentDailyStats(models.Model):
+    """
+    Number of comments per day and per (AI, response, blocked) combination. Kept up to
+    date by `Comment` on create, change and delete; rebuilt by `rebuild_comment_stats`.
+    """
+    day = models.DateField()
+    generated_by_ai = models.BooleanField()
+    is_response = models.BooleanField()
+    is_blocked = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    objects = CommentDailyStatsManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'generated_by_ai', 'is_response', 'is_blocked'], name='comment_daily_stats_unique'
+            ),
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            CommentDailyStats.objects.apply(Counter(comment.stats_key() for comment in objs))
+
+            counters, last_comment_at = Counter(), {}
+            for comment in objs:
+                counters.update(Comment.counter_deltas(comment.counter_key()))
+                if comment.is_published:
+                    latest = last_comment_at.get(comment.post_id, comment.created_at)
+                    last_comment_at[comment.post_id] = max(latest, comment.created_at)
+            Post.objects.apply_comment_counters(counters, last_comment_at)
+
+        for comment in objs:
+            comment._stats_key = comment.stats_key()
+            comment._counter_key = comment.counter_key()
+        return objs
+
+
 class Comment(models.Model):
     content = models.CharField(max_length=MAX_COMMENT_LENGTH)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comment')
     user = models.ForeignKey(AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=True)
-    generated_by_ai = models.BooleanField(default=False, db_index=True)
-    is_response = models.BooleanField(default=False, db_index=True)
+    generated_by_ai = models.BooleanField(default=False)
+    is_response = models.BooleanField(default=False)
     is_blocked = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    moderation_status = models.CharField(
+        max_length=16, choices=ModerationStatus, default=ModerationStatus.APPROVED, db_index=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
     respond_at = models.DateTimeField(null=True, blank=True)
-    task = models.OneToOneField(PeriodicTask, on_delete=models.SET_NULL, null=True, blank=True)
-    
-    def _create_crontab_schedule(self, respond_at):
-        schedule, _ = CrontabSchedule.objects.get_or_create(
-            minute = respond_at.minute,
-            hour = respond_at.hour,
-            day_of_week=respond_at.isoweekday(),
-            day_of_month=respond_at.day,
-            month_of_year=respond_at.month
-        )
-
-        return schedule
-    
-    def _create_task(self):
-        return PeriodicTask.objects.create(
-            crontab = self._create_crontab_schedule(self.respond_at),
-            name = f'Auto comment response. Respond at {self.respond_at}',
-            task = 'blog.tasks.auto_comment_response',
-            kwargs = json.dumps({'user_id': self.user.id, 'comment_id': self.id}),
-            one_off = True
-        )
+    # Reply tree: the comment replied to, the top-level comment of the thread (None for
+    # top-level comments) and the distance from it, so a thread loads in one query.
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='replies')
+    root = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    depth = models.PositiveIntegerField(default=0)
+    reply_dispatched_at = models.DateTimeField(null=True, blank=True)
+    # Failed auto reply attempts, see `blog.tasks.auto_comment_response_batch`.
+    reply_attempts = models.PositiveSmallIntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
+
+    STATS_FIELDS = ('created_at', 'generated_by_ai', 'is_response', 'is_blocked')
+    COUNTER_FIELDS = ('post_id', 'moderation_status', 'generated_by_ai', 'is_response', 'is_blocked')
+    TRACKED_FIELDS = tuple(dict.fromkeys(STATS_FIELDS + COUNTER_FIELDS))
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of `retrieve_post_comments`, only over the comments it can return.
+            models.Index(fields=['post', '-created_at', '-id'], condition=VISIBLE_COMMENT, name='comment_visible_feed_idx'),
+            # Covers the hourly/per-post/per-author breakdowns: `created_at` ranges answered from the index alone.
+            models.Index(
+                fields=['created_at', 'generated_by_ai', 'is_response', 'is_blocked', 'post', 'user'],
+                name='comment_analytics_idx'
+            ),
+            # Whole reply trees of a page of top-level comments, see `retrieve_post_thread`.
+            models.Index(fields=['root', 'depth', 'created_at', 'id'], name='comment_thread_idx'),
+            # Queue of auto replies that still have to be sent, see `blog.tasks.dispatch_due_replies`.
+            models.Index(
+                fields=['respond_at'],
+                condition=models.Q(respond_at__isnull=False, reply_dispatched_at__isnull=True),
+                name='comment_due_reply_idx'
+            ),
+        ]
+
+    def reply_thread_fields(self) -> dict:
+        """
+        Tree fields for a new reply to this comment.
+        """
+        return {'parent': self, 'root_id': self.root_id or self.id, 'depth': self.depth + 1}
+
+    def _schedule_auto_reply(self) -> bool:
+        if (self.respond_at or self.is_response or self.generated_by_ai or self.is_blocked
+                or self.moderation_status != ModerationStatus.APPROVED or not self.user.auto_post_reply):
+            return False
+
+        self.respond_at = (self.created_at or timezone.now()) + timedelta(minutes=self.user.auto_post_reply)
+        return True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields().intersection(cls.TRACKED_FIELDS):
+            instance._stats_key = instance.stats_key()
+            instance._counter_key = instance.counter_key()
+        return instance
+
+    @property
+    def is_published(self) -> bool:
+        return self.moderation_status == ModerationStatus.APPROVED and not self.is_blocked
+
+    def stats_key(self) -> tuple:
+        created_at = self.created_at
+        day = timezone.localdate(created_at) if timezone.is_aware(created_at) else created_at.date()
+        return (day, self.generated_by_ai, self.is_response, self.is_blocked)
+
+    def counter_key(self) -> tuple:
+        """
+        (post_id, *flags): which of the post's POST_COMMENT_COUNTERS this comment counts in.
+        """
+        is_ai_reply = self.is_published and self.generated_by_ai and self.is_response
+        return (self.post_id, self.is_published, self.is_blocked, is_ai_reply)
+
+    @staticmethod
+    def counter_deltas(counter_key: tuple, sign: int = 1) -> Counter:
+        post_id, *flags = counter_key
+        return Counter({(post_id, counter): sign for counter, flag in zip(POST_COMMENT_COUNTERS, flags) if flag})
+
+    def _stored_keys(self) -> tuple:
+        if self._state.adding:
+            return None, None
+        if getattr(self, '_stats_key', None) is not None:
+            return self._stats_key, self._counter_key
+
+        stored = Comment.objects.filter(id=self.id).values_list(*self.TRACKED_FIELDS).first()
+        if not stored:
+            return None, None
+        comment = Comment(**dict(zip(self.TRACKED_FIELDS, stored)))
+        return comment.stats_key(), comment.counter_key()
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        if self._schedule_auto_reply() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'respond_at'}
 
-        if (not self.user.auto_post_reply or self.task or self.is_response 
-                or self.generated_by_ai or self.is_blocked):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not {
+            self._meta.get_field(name).attname for name in update_fields
+        }.intersection(self.TRACKED_FIELDS):
+            super().save(*args, **kwargs)
             return
 
-        self.respond_at = self.created_at + timedelta(minutes=self.user.auto_post_reply)
-        self.task = self._create_task()
-        self.save()
+        with transaction.atomic(savepoint=False):
+            old_stats_key, old_counter_key = self._stored_keys()
+            super().save(*args, **kwargs)
+            self._stats_key, self._counter_key = self.stats_key(), self.counter_key()
+
+            if old_stats_key != self._stats_key:
+                deltas = Counter({self._stats_key: 1})
+                if old_stats_key is not None:
+                    deltas[old_stats_key] -= 1
+                CommentDailyStats.objects.apply(deltas)
+
+            if old_counter_key != self._counter_key:
+                deltas = self.counter_deltas(self._counter_key)
+                if old_counter_key is not None:
+                    deltas.subtract(self.counter_deltas(old_counter_key))
+                newly_published = self.is_published and not (old_counter_key and old_counter_key[1])
+                Post.objects.apply_comment_counters(
+                    deltas, {self.post_id: self.created_at} if newly_published else None
+                )
     
     def __str__(self):
         return self.content[:15] + '...'
@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Generic, List, Optional, TypeVar
+
+from django.db.models import QuerySet
+from django.http.response import HttpResponseBase
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import PaginationBase
+from rest_framework.status import HTTP_400_BAD_REQUEST
+
+from .constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, INVALID_CURSOR_ERROR
+
+
+T = TypeVar('T')
+
+
+class CursorPageSchema(Schema, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    payload = json.dumps([created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, ValueError, TypeError):
+        raise HttpError(HTTP_400_BAD_REQUEST, INVALID_CURSOR_ERROR)
+
+
+class KeysetPagination(PaginationBase):
+    """
+    Cursor pagination over `(created_at, id)`, newest first. The cursor points at the
+    last row of the previous page, so every page is an index range scan of `limit`
+    rows no matter how deep the client has paged.
+    """
+
+    class Input(Schema):
+        cursor: Optional[str] = None
+        limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+    class Output(Schema):
+        items: List[Any]
+        next_cursor: Optional[str]
+
+    def paginate_queryset(self, queryset: QuerySet, pagination: Input, **params):
+        if isinstance(queryset, HttpResponseBase):
+            # The view already answered, e.g. 304 Not Modified.
+            return queryset
+
+        queryset = queryset.order_by('-created_at', '-id')
+
+        if pagination.cursor:
+            created_at, pk = decode_cursor(pagination.cursor)
+            queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+
+        items = list(queryset[:pagination.limit + 1])
+        next_cursor = None
+        if len(items) > pagination.limit:
+            items = items[:pagination.limit]
+            next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+
+        return {'items': items, 'next_cursor': next_cursor}
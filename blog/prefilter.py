@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Optional
+
+
+LEETSPEAK = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's', '!': 'i', '|': 'l',
+})
+TOKEN_RE = re.compile(r'[^\W_]+|\+')
+REPEATED_CHAR_RE = re.compile(r'(.)\1{2,}')
+PUNCTUATION = '!?.,;:\'"()'
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercases, undoes leetspeak, squeezes character runs ("kysss" -> "kys") and joins
+    spaced-out letters ("k y s", "k.y.s" -> "kys"), returning space separated tokens.
+    """
+    # Punctuation around a word is punctuation ("kys!!!"), inside it it is leetspeak ("k!ll").
+    words = (word.strip(PUNCTUATION) for word in unicodedata.normalize('NFKC', text).casefold().split())
+    text = REPEATED_CHAR_RE.sub(r'\1', ' '.join(words).translate(LEETSPEAK))
+
+    tokens = []
+    letters = []
+    for token in TOKEN_RE.findall(text):
+        if len(token) == 1 and token != '+':
+            letters.append(token)
+            continue
+        if letters:
+            tokens.append(''.join(letters))
+            letters = []
+        tokens.append(token)
+    if letters:
+        tokens.append(''.join(letters))
+
+    return ' '.join(tokens)
+
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton: finds any of the patterns in a single pass over the text.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state] = pattern
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+class LexicalPrefilter:
+    """
+    Resolves clear-cut texts without a model call: any blocklisted phrase (matched on
+    word boundaries) blocks the text, a text that is entirely an allowlisted phrase
+    passes. Everything else is left to the model (`check` returns None).
+    """
+
+    def __init__(self, blocklist, allowlist):
+        self.matcher = PatternMatcher(f' {normalize(phrase)} ' for phrase in blocklist)
+        self.allowlist = frozenset(normalize(phrase) for phrase in allowlist)
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.blocked = 0
+        self.allowed = 0
+        self.elapsed_ns = 0
+
+    def check(self, content: str) -> Optional[bool]:
+        started = time.perf_counter_ns()
+        normalized = normalize(content)
+
+        if self.matcher.search(f' {normalized} ') is not None:
+            verdict = False
+        elif normalized in self.allowlist:
+            verdict = True
+        else:
+            verdict = None
+
+        elapsed = time.perf_counter_ns() - started
+        with self._lock:
+            self.checks += 1
+            self.elapsed_ns += elapsed
+            if verdict is False:
+                self.blocked += 1
+            elif verdict is True:
+                self.allowed += 1
+        return verdict
+
+    def stats(self) -> dict:
+        with self._lock:
+            resolved = self.blocked + self.allowed
+            return {
+                'checks': self.checks,
+                'blocked': self.blocked,
+                'allowed': self.allowed,
+                'resolved_ratio': resolved / self.checks if self.checks else 0.0,
+                'avg_cost_us': self.elapsed_ns / self.checks / 1000 if self.checks else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.checks = self.blocked = self.allowed = self.elapsed_ns = 0
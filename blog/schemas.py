@@ -1,10 +1,11 @@
-from typing import Optional
+from typing import List, Literal, Optional, Union
 
-from datetime import date
-from ninja import Schema, ModelSchema, Field
+from datetime import date, datetime
+from ninja import Field, Schema, ModelSchema
 
 from user.schemas import UserOutputSchema
 from .models import Post, Comment
+from .constants import MAX_BULK_SIZE
 
 
 class PostInputSchema(ModelSchema):
@@ -12,12 +13,18 @@ class PostInputSchema(ModelSchema):
         model = Post
         fields = ['title', 'content']
 
+class BulkPostInputSchema(Schema):
+    items: List[PostInputSchema] = Field(..., min_length=1, max_length=MAX_BULK_SIZE)
+
 class PostOutputSchema(ModelSchema):
     user: UserOutputSchema
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'content', 'created_at']
+        fields = [
+            'id', 'title', 'content', 'moderation_status', 'created_at',
+            'comment_count', 'blocked_comment_count', 'ai_reply_count', 'last_comment_at'
+        ]
 
 class PostUpdateSchema(Schema):
     title: Optional[str]
@@ -28,16 +35,52 @@ class CommentInputSchema(ModelSchema):
         model = Comment
         fields = ['content']
 
+class BulkCommentInputSchema(Schema):
+    items: List[CommentInputSchema] = Field(..., min_length=1, max_length=MAX_BULK_SIZE)
+
 class CommentOutputSchema(ModelSchema):
-    post_id: int = Field(..., alias='post.id')
+    post_id: int
     user: UserOutputSchema
     
     class Meta:
         model = Comment
-        fields = ['id', 'content', 'created_at']
+        fields = ['id', 'content', 'moderation_status', 'created_at']
+
+class BulkItemResultSchema(Schema):
+    index: int
+    id: Optional[int]
+    moderation_status: str
+    blocked: bool
+
+class CommentThreadSchema(CommentOutputSchema):
+    depth: int
+    replies: List['CommentThreadSchema'] = []
+
+class ModerationStatusSchema(Schema):
+    id: int
+    moderation_status: str
 
 class CommentDailyBrekadownSchema(Schema):
     day: date
     total_comments: int
     blocked_comments: int
     published_comments: int
+
+class CommentBreakdownSchema(Schema):
+    period: Union[datetime, date]
+    post_id: Optional[int] = None
+    user_id: Optional[int] = None
+    total_comments: int
+    blocked_comments: int
+    published_comments: int
+    ai_comments: int
+    human_comments: int
+    non_response_comments: int
+
+class SearchResultSchema(Schema):
+    kind: Literal['post', 'comment']
+    id: int
+    post_id: int
+    title: Optional[str]
+    snippet: str
+    score: float
@@ -0,0 +1,196 @@
+import base64
+import binascii
+import json
+import re
+
+from django.db import connections
+from ninja.errors import HttpError
+from rest_framework.status import HTTP_400_BAD_REQUEST
+
+from .constants import INVALID_CURSOR_ERROR
+from .models import ModerationStatus
+
+
+SEARCH_TABLE = 'blog_search'
+TOKEN_RE = re.compile(r'\w+')
+
+# Posts are stored under rowid `id * 2`, comments under `id * 2 + 1`, so both live in one
+# ranked index and a row can be dropped without looking anything up.
+# Only published content is indexed: comments too are dropped while their post is not
+# approved, and come back when it is.
+_SCHEMA = [
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, title, content,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_insert AFTER INSERT ON blog_post
+    WHEN new.moderation_status = '{ModerationStatus.APPROVED}'
+    BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+        VALUES (new.id * 2, 'post', new.id, new.id, new.title, new.content);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_update AFTER UPDATE OF title, content, moderation_status ON blog_post
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+        INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+        SELECT new.id * 2, 'post', new.id, new.id, new.title, new.content
+        WHERE new.moderation_status = '{ModerationStatus.APPROVED}';
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_status AFTER UPDATE OF moderation_status ON blog_post
+    WHEN old.moderation_status IS NOT new.moderation_status
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id * 2 + 1 FROM blog_comment WHERE post_id = new.id);
+        INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+        SELECT id * 2 + 1, 'comment', id, post_id, '', content FROM blog_comment
+        WHERE post_id = new.id AND moderation_status = '{ModerationStatus.APPROVED}' AND NOT is_blocked
+            AND new.moderation_status = '{ModerationStatus.APPROVED}';
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_post_delete AFTER DELETE ON blog_post
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_insert AFTER INSERT ON blog_comment
+    WHEN new.moderation_status = '{ModerationStatus.APPROVED}' AND NOT new.is_blocked
+        AND (SELECT moderation_status FROM blog_post WHERE id = new.post_id) = '{ModerationStatus.APPROVED}'
+    BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+        VALUES (new.id * 2 + 1, 'comment', new.id, new.post_id, '', new.content);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_update
+    AFTER UPDATE OF content, moderation_status, is_blocked ON blog_comment
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+        SELECT new.id * 2 + 1, 'comment', new.id, new.post_id, '', new.content
+        WHERE new.moderation_status = '{ModerationStatus.APPROVED}' AND NOT new.is_blocked
+            AND (SELECT moderation_status FROM blog_post WHERE id = new.post_id) = '{ModerationStatus.APPROVED}';
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_comment_delete AFTER DELETE ON blog_comment
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    ''',
+]
+
+_DROP = [
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+    *(f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{name}' for name in (
+        'post_insert', 'post_update', 'post_status', 'post_delete', 'comment_insert', 'comment_update',
+        'comment_delete'
+    )),
+]
+
+_FILL = [
+    f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+    SELECT id * 2, 'post', id, id, title, content FROM blog_post
+    WHERE moderation_status = '{ModerationStatus.APPROVED}'
+    ''',
+    f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, post_id, title, content)
+    SELECT blog_comment.id * 2 + 1, 'comment', blog_comment.id, post_id, '', blog_comment.content
+    FROM blog_comment JOIN blog_post ON blog_post.id = blog_comment.post_id
+    WHERE blog_comment.moderation_status = '{ModerationStatus.APPROVED}' AND NOT blog_comment.is_blocked
+        AND blog_post.moderation_status = '{ModerationStatus.APPROVED}'
+    ''',
+]
+
+
+def is_supported(using='default') -> bool:
+    return connections[using].vendor == 'sqlite'
+
+def create_search_index(using='default'):
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in _SCHEMA:
+            cursor.execute(statement)
+
+def rebuild_search_index(using='default') -> int:
+    """
+    Drops and refills the index from the base tables. Returns the number of indexed rows.
+    """
+    with connections[using].cursor() as cursor:
+        for statement in (*_DROP, *_SCHEMA, *_FILL):
+            cursor.execute(statement)
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def match_expression(query: str) -> str:
+    # Every word must match (as a prefix for the last one, for search-as-you-type);
+    # quoting keeps FTS5 operators typed by users from being interpreted.
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return ''
+    return ' '.join([*(f'"{token}"' for token in tokens[:-1]), f'"{tokens[-1]}"*'])
+
+def encode_search_cursor(rank: float, rowid: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, rowid]).encode()).decode().rstrip('=')
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, rowid = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(rank), int(rowid)
+    except (binascii.Error, ValueError, TypeError):
+        raise HttpError(HTTP_400_BAD_REQUEST, INVALID_CURSOR_ERROR)
+
+
+def search(query: str, limit: int, cursor: str = None, kind: str = None, using='default') -> dict:
+    """
+    Best matches first (bm25, title weighted above content), read from the FTS index
+    only. Pages continue after the `(rank, rowid)` of the previous page's last hit.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return {'items': [], 'next_cursor': None}
+
+    conditions = [f'{SEARCH_TABLE} MATCH %s']
+    params = [expression]
+    if kind is not None:
+        conditions.append('kind = %s')
+        params.append(kind)
+    if cursor:
+        rank, rowid = decode_search_cursor(cursor)
+        conditions.append('(rank > %s OR (rank = %s AND rowid > %s))')
+        params += [rank, rank, rowid]
+
+    with connections[using].cursor() as db_cursor:
+        db_cursor.execute(
+            f'''
+            SELECT rowid, rank, kind, object_id, post_id, title,
+                   snippet({SEARCH_TABLE}, -1, '<b>', '</b>', '...', 16)
+            FROM {SEARCH_TABLE}
+            WHERE {' AND '.join(conditions)} AND rank MATCH 'bm25(0.0, 0.0, 0.0, 4.0, 1.0)'
+            ORDER BY rank, rowid
+            LIMIT %s
+            ''',
+            [*params, limit + 1]
+        )
+        rows = db_cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1][1], rows[-1][0])
+
+    items = [
+        {'kind': kind, 'id': object_id, 'post_id': post_id, 'title': title or None, 'snippet': snippet, 'score': -rank}
+        for _, rank, kind, object_id, post_id, title, snippet in rows
+    ]
+    return {'items': items, 'next_cursor': next_cursor}
@@ -0,0 +1,76 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, post_migrate
+from django.dispatch import receiver
+
+from user.models import User
+
+from .analytics import daily_stats_cache
+from .search import create_search_index
+from .content_cache import content_cache, post_cache_key, comment_cache_key, author_cache_key
+from .models import Post, Comment, CommentDailyStats, comment_stats_changed, post_counters_changed
+
+
+def _deletes_post(origin, post_id: int) -> bool:
+    if isinstance(origin, Post):
+        return origin.id == post_id
+    # Every comment cascaded from a queryset of posts belongs to one of them.
+    return isinstance(origin, QuerySet) and origin.model is Post
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_stats(sender, instance, origin=None, **kwargs):
+    # A signal rather than Comment.delete, so cascades from Post/User deletes are counted too.
+    stats_key = getattr(instance, '_stats_key', None) or instance.stats_key()
+    CommentDailyStats.objects.apply(Counter({stats_key: -1}))
+
+    # The counters of a post being deleted go with it: no UPDATE per cascaded comment.
+    if _deletes_post(origin, instance.post_id):
+        return
+    counter_key = getattr(instance, '_counter_key', None) or instance.counter_key()
+    Post.objects.apply_comment_counters(Comment.counter_deltas(counter_key, sign=-1))
+
+
+@receiver(comment_stats_changed, sender=CommentDailyStats)
+def invalidate_daily_stats_cache(sender, days, **kwargs):
+    daily_stats_cache.invalidate(days)
+
+
+def _invalidate_content(key: str):
+    # Again after commit: a concurrent read may have cached the old row in between.
+    content_cache.delete(key)
+    transaction.on_commit(lambda: content_cache.delete(key))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    _invalidate_content(post_cache_key(instance.id))
+
+
+@receiver(post_counters_changed, sender=Post)
+def invalidate_cached_post_counters(sender, post_ids, **kwargs):
+    for post_id in post_ids:
+        _invalidate_content(post_cache_key(post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_cached_comment(sender, instance, **kwargs):
+    _invalidate_content(comment_cache_key(instance.id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_author(sender, instance, **kwargs):
+    # Post and comment payloads only hold the author's id, so this one entry is enough.
+    _invalidate_content(author_cache_key(instance.id))
+
+
+@receiver(post_migrate)
+def create_search_table(sender, using, **kwargs):
+    # The FTS table and its triggers are raw SQL, so they follow the blog tables here.
+    if sender.name == 'blog':
+        create_search_index(using)
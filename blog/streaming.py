@@ -0,0 +1,29 @@
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from ninja import Schema
+
+from .constants import STREAM_CHUNK_SIZE
+
+
+def _json_array(queryset: QuerySet, schema: type[Schema], chunk_size: int):
+    yield '['
+    separator = ''
+    buffer = []
+
+    for row in queryset.iterator(chunk_size=chunk_size):
+        buffer.append(separator + schema.from_orm(row).model_dump_json())
+        separator = ','
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+
+    yield ''.join(buffer) + ']'
+
+
+def stream_json_array(queryset: QuerySet, schema: type[Schema], chunk_size: int = None):
+    """
+    Streams `queryset` as a JSON array, serializing rows with `schema` as they come off a
+    server-side cursor, so memory stays flat and the first bytes go out immediately.
+    """
+    rows = _json_array(queryset, schema, chunk_size or STREAM_CHUNK_SIZE)
+    return StreamingHttpResponse(rows, content_type='application/json')
@@ -1,12 +1,31 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
 from ai_blog.celery import celery_app
+from ai_blog.throttling import ThrottledError
+from ai_blog.settings import (
+    AUTO_REPLY_SWEEP_BATCH_SIZE, AUTO_REPLY_TASK_BATCH_SIZE, AUTO_REPLY_POOL_SIZE, AUTO_REPLY_RETRY_BASE_DELAY,
+    AUTO_REPLY_MAX_ATTEMPTS
+)
 
 from user.models import User
 
-from .models import Comment, CommentResponse
-from .helpers import get_ai_response
+from .models import Post, Comment, CommentResponse, ModerationStatus
+from .helpers import get_ai_response, ai_verify_safety, ai_verify_safety_batch
+
 
+logger = logging.getLogger(__name__)
 
-@celery_app.task(name='blog.tasks.auto_comment_response')
+# Tasks refused by the Gemini client (quota wait too long, circuit open) run again later.
+THROTTLED_RETRY = {'autoretry_for': (ThrottledError,), 'retry_backoff': 5, 'retry_jitter': True, 'max_retries': 5}
+
+
+@celery_app.task(name='blog.tasks.auto_comment_response', **THROTTLED_RETRY)
 def auto_comment_response(user_id=None, comment_id=None):
     try:
         comment = Comment.objects.get(id=comment_id)
@@ -19,8 +38,183 @@ def auto_comment_response(user_id=None, comment_id=None):
         post = comment.post,
         user = user,
         generated_by_ai = True,
-        is_response = True
+        is_response = True,
+        **comment.reply_thread_fields()
     )
-    comment.task.crontab.delete()
     
     CommentResponse.objects.create(comment=comment, response=response)
+
+
+@celery_app.task(name='blog.tasks.dispatch_due_replies')
+def dispatch_due_replies():
+    """
+    Periodic sweeper for auto replies. Claims comments whose `respond_at` has passed in
+    batches (walking the partial `comment_due_reply_idx` index, so the cost depends on
+    the number of due replies, not on how many are scheduled) and enqueues their replies.
+    """
+    now = timezone.now()
+
+    while True:
+        with transaction.atomic():
+            due = list(
+                Comment.objects.select_for_update(skip_locked=True).filter(
+                    respond_at__lte=now, reply_dispatched_at__isnull=True
+                ).order_by('respond_at').values_list('id', 'user_id')[:AUTO_REPLY_SWEEP_BATCH_SIZE]
+            )
+            if not due:
+                return
+            Comment.objects.filter(id__in=[comment_id for comment_id, _ in due]).update(reply_dispatched_at=now)
+
+        comment_ids = [comment_id for comment_id, _ in due]
+        for start in range(0, len(comment_ids), AUTO_REPLY_TASK_BATCH_SIZE):
+            auto_comment_response_batch.delay(comment_ids=comment_ids[start:start + AUTO_REPLY_TASK_BATCH_SIZE])
+
+
+def _generate_reply(comment):
+    # The error is returned rather than raised so one failure does not lose the whole batch.
+    try:
+        return get_ai_response(comment.content), None
+    except Exception as error:
+        return None, error
+
+
+def _reschedule_replies(comments):
+    """
+    Puts failed replies back in the due queue with exponential backoff. After
+    AUTO_REPLY_MAX_ATTEMPTS attempts they stay claimed, so the sweeper drops them.
+    """
+    now = timezone.now()
+    by_attempts = defaultdict(list)
+    for comment in comments:
+        by_attempts[comment.reply_attempts + 1].append(comment.id)
+
+    for attempts, comment_ids in by_attempts.items():
+        if attempts >= AUTO_REPLY_MAX_ATTEMPTS:
+            logger.warning('Giving up auto replies to comments %s after %s attempts', comment_ids, attempts)
+            Comment.objects.filter(id__in=comment_ids).update(reply_attempts=attempts)
+            continue
+        Comment.objects.filter(id__in=comment_ids).update(
+            reply_attempts = attempts,
+            reply_dispatched_at = None,
+            respond_at = now + timedelta(seconds=AUTO_REPLY_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        )
+
+
+@celery_app.task(name='blog.tasks.auto_comment_response_batch')
+def auto_comment_response_batch(comment_ids=None):
+    """
+    Replies to several due comments at once: one query loads them with their posts and
+    users, replies are generated concurrently on a bounded pool and written with two
+    bulk inserts. Failed replies are rescheduled with backoff; errors other than
+    throttling are re-raised once the batch is saved.
+    """
+    comments = list(Comment.objects.select_related('post', 'user').filter(id__in=comment_ids or []))
+    if not comments:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(AUTO_REPLY_POOL_SIZE, len(comments))) as pool:
+        results = list(pool.map(_generate_reply, comments))
+
+    answered = [(comment, reply) for comment, (reply, error) in zip(comments, results) if error is None]
+    failed = [(comment, error) for comment, (reply, error) in zip(comments, results) if error is not None]
+
+    with transaction.atomic():
+        responses = Comment.objects.bulk_create([
+            Comment(
+                content = reply,
+                post = comment.post,
+                user = comment.user,
+                generated_by_ai = True,
+                is_response = True,
+                **comment.reply_thread_fields()
+            )
+            for comment, reply in answered
+        ])
+        CommentResponse.objects.bulk_create([
+            CommentResponse(comment=comment, response=response)
+            for (comment, _), response in zip(answered, responses)
+        ])
+        if failed:
+            _reschedule_replies([comment for comment, _ in failed])
+
+    unexpected = [(comment, error) for comment, error in failed if not isinstance(error, ThrottledError)]
+    for comment, error in unexpected[1:]:
+        logger.error('Auto reply generation failed for comment %s', comment.id, exc_info=error)
+    if unexpected:
+        raise unexpected[0][1]
+
+
+def _save_post_verdicts(posts, verdicts):
+    with transaction.atomic():
+        current = Post.objects.select_for_update().filter(moderation_status=ModerationStatus.PENDING).in_bulk(
+            [post.id for post in posts]
+        )
+        for checked, is_safe in zip(posts, verdicts):
+            post = current.get(checked.id)
+            # The verdict is only for the text that was checked: an edit made meanwhile
+            # queued its own moderation.
+            if post is None or (post.title, post.content) != (checked.title, checked.content):
+                continue
+            post.moderation_status = ModerationStatus.APPROVED if is_safe else ModerationStatus.BLOCKED
+            post.save(update_fields=['moderation_status'])
+
+
+def _save_comment_verdicts(comments, verdicts):
+    with transaction.atomic():
+        current = Comment.objects.select_for_update().select_related('user').filter(
+            moderation_status=ModerationStatus.PENDING
+        ).in_bulk([comment.id for comment in comments])
+        for checked, is_safe in zip(comments, verdicts):
+            comment = current.get(checked.id)
+            # Same as for posts: comments have no `updated_at`, so the checked content is compared.
+            if comment is None or comment.content != checked.content:
+                continue
+            comment.is_blocked = not is_safe
+            comment.moderation_status = ModerationStatus.APPROVED if is_safe else ModerationStatus.BLOCKED
+            # Full save: approving a comment is what schedules its auto reply.
+            comment.save()
+
+
+@celery_app.task(name='blog.tasks.moderate_post', **THROTTLED_RETRY)
+def moderate_post(post_id=None):
+    try:
+        post = Post.objects.get(id=post_id, moderation_status=ModerationStatus.PENDING)
+    except Post.DoesNotExist:
+        return
+
+    _save_post_verdicts([post], [all(ai_verify_safety_batch([post.content, post.title]))])
+
+
+@celery_app.task(name='blog.tasks.moderate_posts', **THROTTLED_RETRY)
+def moderate_posts(post_ids=None):
+    """
+    Pending posts of a bulk insert, checked with a single `ai_verify_safety_batch` call.
+    """
+    posts = list(Post.objects.filter(id__in=post_ids or [], moderation_status=ModerationStatus.PENDING))
+    if not posts:
+        return
+
+    checks = ai_verify_safety_batch([text for post in posts for text in (post.content, post.title)])
+    _save_post_verdicts(posts, [checks[2 * index] and checks[2 * index + 1] for index in range(len(posts))])
+
+
+@celery_app.task(name='blog.tasks.moderate_comment', **THROTTLED_RETRY)
+def moderate_comment(comment_id=None):
+    try:
+        comment = Comment.objects.get(id=comment_id, moderation_status=ModerationStatus.PENDING)
+    except Comment.DoesNotExist:
+        return
+
+    _save_comment_verdicts([comment], [ai_verify_safety(comment.content)])
+
+
+@celery_app.task(name='blog.tasks.moderate_comments', **THROTTLED_RETRY)
+def moderate_comments(comment_ids=None):
+    """
+    Pending comments of a bulk insert, checked with a single `ai_verify_safety_batch` call.
+    """
+    comments = list(Comment.objects.filter(id__in=comment_ids or [], moderation_status=ModerationStatus.PENDING))
+    if not comments:
+        return
+
+    _save_comment_verdicts(comments, ai_verify_safety_batch([comment.content for comment in comments]))
@@ -1,21 +1,68 @@
 import json
-from datetime import date
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django_celery_beat.models import CrontabSchedule, PeriodicTask
+from django.db import connection, OperationalError
+from django.db.models import Count, Max, Q
+from django.test import TestCase, AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils import timezone
 from ninja_jwt.tokens import RefreshToken
 from rest_framework.status import (
     HTTP_401_UNAUTHORIZED, HTTP_201_CREATED, HTTP_400_BAD_REQUEST,
-    HTTP_200_OK
+    HTTP_200_OK, HTTP_304_NOT_MODIFIED, HTTP_404_NOT_FOUND, HTTP_422_UNPROCESSABLE_ENTITY,
+    HTTP_503_SERVICE_UNAVAILABLE
 )
 from rest_framework.test import APIClient
 from freezegun import freeze_time
 
+from google.api_core import exceptions as google_exceptions
+from google.generativeai.protos import Candidate
+
+from ai_blog.ai import AIProvider, get_ai_provider
+from ai_blog.gemini import GeminiClient, GeminiProvider
+from ai_blog.settings import ANALYTICS_MAX_RANGE_DAYS, AUTO_REPLY_MAX_ATTEMPTS, GEMINI_RETRY_MAX_DELAY
+from ai_blog.local_ai import LocalAIProvider, InjectedFailure
+from ai_blog.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from ai_blog.throttling import (
+    ThrottledError, LocalTokenBucket, CircuitBreaker, AdaptiveConcurrencyLimit, RateLimitTimeout, CircuitOpenError,
+    QuotaExhausted
+)
 from user.models import User
-from .helpers import ai_verify_safety, get_ai_response
-from .constants import MAX_AI_RESPONSE_LENGTH
-from .models import Post, Comment
+from .batching import MicroBatcher
+from .prefilter import LexicalPrefilter, normalize
+from .analytics import daily_stats_cache
+from .content_cache import content_cache
+from .helpers import ai_verify_safety, ai_verify_safety_batch, get_ai_response, verdict_cache
+from .constants import MAX_AI_RESPONSE_LENGTH, MAX_BULK_SIZE
+from .api import _posts_for_output, _comments_for_output
+from .models import Post, Comment, CommentResponse, CommentDailyStats, ModerationStatus, VISIBLE_COMMENT
+from .tasks import (
+    moderate_comment, moderate_comments, moderate_post, moderate_posts, dispatch_due_replies,
+    auto_comment_response_batch
+)
+
 
+# Providers the tests run against, whatever `.env` selects or configures.
+TEST_AI_PROVIDERS = {
+    'gemini': {'BACKEND': 'ai_blog.gemini.GeminiProvider'},
+    'local': {'BACKEND': 'ai_blog.local_ai.LocalAIProvider'},
+}
 
+
+# These run against the offline provider, whatever AI_PROVIDER is set to.
+@override_settings(AI_PROVIDER='local', AI_PROVIDERS=TEST_AI_PROVIDERS)
 class AiFunctionsTestCase(TestCase):
     def setUp(self):
         self.safe_messages = [
@@ -47,6 +94,353 @@ class AiFunctionsTestCase(TestCase):
         assert len(response) <= MAX_AI_RESPONSE_LENGTH
 
 
+def fake_model_response(is_safe=True):
+    finish_reason = Candidate.FinishReason.STOP if is_safe else Candidate.FinishReason.SAFETY
+    return mock.Mock(candidates=[mock.Mock(finish_reason=finish_reason)])
+
+
+class FakeModerationMixin:
+    """
+    Runs against the Gemini provider with its model mocked as `self.ai_model`, which
+    blocks the prompts containing `unsafe_word` (when set). Caches start empty.
+    """
+    unsafe_word = None
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        verdict_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(verdict_cache.clear_local)
+
+        self.enterContext(override_settings(AI_PROVIDER='gemini', AI_PROVIDERS=TEST_AI_PROVIDERS))
+        self.ai_model = self.enterContext(mock.patch.object(get_ai_provider('gemini'), 'model'))
+        if self.unsafe_word is not None:
+            self.ai_model.generate_content.side_effect = self._fake_response
+            self.ai_model.generate_content_async = mock.AsyncMock(side_effect=self._fake_response)
+
+    def _fake_response(self, prompt, **kwargs):
+        return fake_model_response(is_safe=self.unsafe_word not in prompt)
+
+
+@override_settings(AI_PROVIDER='gemini', AI_PROVIDERS=TEST_AI_PROVIDERS)
+class GeminiClientTestCase(TestCase):
+    def setUp(self):
+        self.model = mock.Mock()
+        self.client = GeminiClient(
+            model = self.model,
+            limiter = LocalTokenBucket(rate=1000, capacity=10),
+            breaker = CircuitBreaker(threshold=3, cooldown=60),
+            concurrency = AdaptiveConcurrencyLimit(initial=8, minimum=1, maximum=16),
+            acquire_timeout = 1,
+            retry_attempts = 3,
+            retry_base_delay = 0,
+            retry_max_delay = 0
+        )
+
+    def test_retries_quota_errors(self):
+        self.model.generate_content.side_effect = [google_exceptions.ResourceExhausted('quota'), 'response']
+
+        self.assertEqual(self.client.generate_content('prompt'), 'response')
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        self.assertEqual(self.client.concurrency.limit, 4 + 1 / 4)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_exhausted_quota_is_throttled(self):
+        self.client.retry_max_delay = 8
+        self.model.generate_content.side_effect = google_exceptions.ResourceExhausted('quota')
+        self.model.generate_content_async = mock.AsyncMock(side_effect=google_exceptions.TooManyRequests('quota'))
+
+        with self.assertRaises(QuotaExhausted) as raised:
+            self.client.generate_content('prompt')
+        self.assertEqual(raised.exception.retry_after, 8)
+        self.assertIsInstance(raised.exception.__cause__, google_exceptions.ResourceExhausted)
+        self.assertEqual(self.model.generate_content.call_count, 3)
+        with self.assertRaises(QuotaExhausted):
+            async_to_sync(self.client.generate_content_async)('prompt')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_client_errors_are_not_retried(self):
+        self.model.generate_content.side_effect = google_exceptions.InvalidArgument('bad prompt')
+
+        with self.assertRaises(google_exceptions.InvalidArgument):
+            self.client.generate_content('prompt')
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+    def test_circuit_opens_after_server_errors(self):
+        self.model.generate_content.side_effect = google_exceptions.ServiceUnavailable('down')
+
+        with self.assertRaises(google_exceptions.ServiceUnavailable):
+            self.client.generate_content('prompt')
+        with self.assertRaises(CircuitOpenError):
+            self.client.generate_content('prompt')
+        self.assertEqual(self.model.generate_content.call_count, 3)
+
+        # After the cooldown one probe goes through and closes the circuit.
+        self.client.breaker._opened_at -= 60
+        self.model.generate_content.side_effect = None
+        self.model.generate_content.return_value = 'response'
+        self.assertEqual(self.client.generate_content('prompt'), 'response')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_slot_timeout_during_probe_frees_circuit(self):
+        self.client.breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+        self.client.concurrency = AdaptiveConcurrencyLimit(initial=1, minimum=1, maximum=1)
+        self.client.acquire_timeout = 0.01
+        self.client.retry_attempts = 1
+        self.model.generate_content.side_effect = google_exceptions.ServiceUnavailable('down')
+        with self.assertRaises(google_exceptions.ServiceUnavailable):
+            self.client.generate_content('prompt')
+        time.sleep(0.02)
+
+        busy = self.client.concurrency.acquire(timeout=1)
+        with self.assertRaises(RateLimitTimeout):
+            self.client.generate_content('prompt')
+        self.client.concurrency.release(busy)
+
+        self.model.generate_content.side_effect = None
+        self.model.generate_content.return_value = 'response'
+        self.assertEqual(self.client.generate_content('prompt'), 'response')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_async_retries(self):
+        self.model.generate_content_async = mock.AsyncMock(
+            side_effect=[google_exceptions.TooManyRequests('quota'), 'response']
+        )
+
+        self.assertEqual(async_to_sync(self.client.generate_content_async)('prompt'), 'response')
+        self.assertEqual(self.model.generate_content_async.await_count, 2)
+
+    def test_token_bucket(self):
+        bucket = LocalTokenBucket(rate=1, capacity=2)
+
+        self.assertEqual([bucket.reserve(), bucket.reserve()], [0, 0])
+        self.assertGreater(bucket.reserve(), 0.9)
+        with self.assertRaises(RateLimitTimeout):
+            bucket.acquire(timeout=0.1)
+
+    def test_concurrency_limit_halves_once_per_burst(self):
+        limit = AdaptiveConcurrencyLimit(initial=8, minimum=1, maximum=16)
+        started = [limit.acquire(timeout=1) for _ in range(8)]
+
+        for start in started:
+            limit.release(start, overloaded=True)
+        self.assertEqual(limit.limit, 4)
+
+        limit.release(limit.acquire(timeout=1), overloaded=True)
+        self.assertEqual(limit.limit, 2)
+        self.assertEqual(limit.inflight, 0)
+
+    def test_app_import_does_not_load_sdk(self):
+        code = 'import django, sys; django.setup(); import ai_blog.urls; print("google.generativeai" in sys.modules)'
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'ai_blog.settings', 'SECRET_KEY': 'test-secret-key'}
+        )
+
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_api_reports_busy_service(self):
+        user = User.objects.create(username='test_username')
+        post = Post.objects.create(title='Test post title', content='Test content', user=user)
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+
+        with mock.patch.object(get_ai_provider('gemini'), 'model') as ai_model:
+            ai_model.generate_content.side_effect = CircuitOpenError('Circuit is open', retry_after=2.5)
+            response = api_client.post(
+                f'/api/blog/post/{post.id}/create-comment', {'content': 'a fresh opinion'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_api_reports_exhausted_quota(self):
+        user = User.objects.create(username='test_username')
+        post = Post.objects.create(title='Test post title', content='Test content', user=user)
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+
+        # The client stays real here; only the SDK model behind it fails.
+        with mock.patch.object(get_ai_provider('gemini').model, 'model') as ai_model, \
+                mock.patch('ai_blog.gemini.time.sleep'):
+            ai_model.generate_content.side_effect = google_exceptions.TooManyRequests('quota')
+            response = api_client.post(
+                f'/api/blog/post/{post.id}/create-comment', {'content': 'a fresh opinion'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], str(GEMINI_RETRY_MAX_DELAY))
+
+
+@override_settings(AI_PROVIDER='gemini', AI_PROVIDERS=TEST_AI_PROVIDERS)
+class LocalAIProviderTestCase(TestCase):
+    def test_rule_based_verdicts(self):
+        provider = LocalAIProvider()
+
+        self.assertFalse(provider.is_safe('Is this text save to public: You should be DEAD already'))
+        self.assertTrue(provider.is_safe('Is this text save to public: The deadline is tomorrow'))
+        self.assertFalse(async_to_sync(provider.ais_safe)('I hate this'))
+
+    def test_canned_replies_are_deterministic(self):
+        replies = [LocalAIProvider().reply(f'Reply to comment {i}') for i in range(20)]
+
+        self.assertEqual(replies, [LocalAIProvider().reply(f'Reply to comment {i}') for i in range(20)])
+        self.assertGreater(len(set(replies)), 1)
+        self.assertTrue(all(len(reply) <= MAX_AI_RESPONSE_LENGTH for reply in replies))
+
+    def test_injected_latency_and_failures(self):
+        def outcomes(provider):
+            results = []
+            for _ in range(50):
+                try:
+                    results.append(provider.is_safe('hello'))
+                except InjectedFailure:
+                    results.append(None)
+            return results
+
+        first = outcomes(LocalAIProvider(error_rate=0.3, seed=7))
+        self.assertEqual(first, outcomes(LocalAIProvider(error_rate=0.3, seed=7)))
+        self.assertTrue(5 < first.count(None) < 30)
+
+        started = time.monotonic()
+        LocalAIProvider(latency=0.05).reply('hello')
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+    def test_selected_by_settings(self):
+        with override_settings(AI_PROVIDER='local'):
+            self.assertIsInstance(get_ai_provider(), LocalAIProvider)
+            self.assertFalse(ai_verify_safety('You should be dead already'))
+            self.assertIn(get_ai_response('Nice post'), LocalAIProvider.REPLIES)
+
+        local = {'BACKEND': 'ai_blog.local_ai.LocalAIProvider', 'OPTIONS': {'error_rate': 1}}
+        with override_settings(AI_PROVIDER='local', AI_PROVIDERS={'local': local}):
+            self.assertEqual(get_ai_provider().error_rate, 1)
+            with self.assertRaises(InjectedFailure):
+                get_ai_response('Nice post')
+
+        self.assertIsInstance(get_ai_provider(), GeminiProvider)
+
+    def test_incomplete_provider_cannot_be_created(self):
+        class ReplyOnlyProvider(AIProvider):
+            def reply(self, prompt):
+                return 'Reply'
+
+        with self.assertRaises(TypeError):
+            ReplyOnlyProvider()
+
+
+class VerdictCacheTestCase(FakeModerationMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch('blog.helpers.prefilter', None))
+
+    def test_repeated_content_skips_model(self):
+        self.ai_model.generate_content.return_value = fake_model_response(is_safe=True)
+
+        self.assertTrue(ai_verify_safety('So relatable'))
+        self.assertTrue(ai_verify_safety('  so   RELATABLE '))
+
+        self.assertEqual(self.ai_model.generate_content.call_count, 1)
+        self.assertEqual(verdict_cache.stats()['local_hits'], 1)
+        self.assertEqual(verdict_cache.stats()['misses'], 1)
+
+    def test_unsafe_verdict_is_cached(self):
+        self.ai_model.generate_content.return_value = fake_model_response(is_safe=False)
+
+        self.assertFalse(ai_verify_safety('kys'))
+        self.assertFalse(ai_verify_safety('kys'))
+
+        self.assertEqual(self.ai_model.generate_content.call_count, 1)
+
+    def test_shared_tier_is_used_after_local_eviction(self):
+        self.ai_model.generate_content.return_value = fake_model_response(is_safe=True)
+
+        ai_verify_safety('+1')
+        verdict_cache.clear_local()
+        ai_verify_safety('+1')
+
+        self.assertEqual(self.ai_model.generate_content.call_count, 1)
+        self.assertEqual(verdict_cache.stats()['shared_hits'], 1)
+
+
+class BatchModerationTestCase(FakeModerationMixin, TestCase):
+    unsafe_word = 'kys'
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch('blog.helpers.prefilter', None))
+
+    def test_safe_texts_share_one_call(self):
+        verdicts = ai_verify_safety_batch(['Test post title', 'Test post content', 'Test post title'])
+
+        self.assertEqual(verdicts, [True, True, True])
+        self.assertEqual(self.ai_model.generate_content.call_count, 1)
+
+    def test_blocked_batch_is_bisected(self):
+        verdicts = ai_verify_safety_batch(['first', 'second', 'kys', 'fourth'])
+
+        self.assertEqual(verdicts, [True, True, False, True])
+        self.assertFalse(ai_verify_safety('kys'))
+        self.assertTrue(ai_verify_safety('fourth'))
+        self.assertEqual(self.ai_model.generate_content.call_count, 5)
+
+    def test_micro_batcher_coalesces_concurrent_requests(self):
+        handler = mock.Mock(side_effect=lambda items: {key: item.upper() for key, item in items.items()})
+        batcher = MicroBatcher(handler, window=0.05, max_size=8)
+
+        futures = [batcher.submit(str(i), f'item {i}') for i in range(6)]
+        futures.append(batcher.submit('0', 'item 0'))
+
+        self.assertEqual([future.result(timeout=1) for future in futures][:2], ['ITEM 0', 'ITEM 1'])
+        self.assertEqual(futures[-1].result(timeout=1), 'ITEM 0')
+        self.assertEqual(handler.call_count, 1)
+        self.assertEqual(len(handler.call_args.args[0]), 6)
+
+
+@override_settings(AI_PROVIDER='gemini', AI_PROVIDERS=TEST_AI_PROVIDERS)
+class LexicalPrefilterTestCase(TestCase):
+    def setUp(self):
+        self.prefilter = LexicalPrefilter(
+            blocklist = ['kys', 'kill yourself'],
+            allowlist = ['+1', 'so relatable']
+        )
+
+    def test_normalize(self):
+        self.assertEqual(normalize('K y S!!!'), 'kys')
+        self.assertEqual(normalize('k1ll   y0urs3lf'), 'kill yourself')
+        self.assertEqual(normalize('kysss'), 'kys')
+
+    def test_blocklist_matches_obfuscated_text(self):
+        for content in ['kys', 'just k.y.s', 'You can KILL yourself.', 'k1ll y0urs3lf now']:
+            self.assertFalse(self.prefilter.check(content), content)
+
+    def test_blocklist_respects_word_boundaries(self):
+        self.assertIsNone(self.prefilter.check('Skyscrapers are tall'))
+        self.assertIsNone(self.prefilter.check('The killer yourselves'))
+
+    def test_allowlist_requires_whole_text(self):
+        self.assertTrue(self.prefilter.check('So relatable!'))
+        self.assertTrue(self.prefilter.check('+1'))
+        self.assertIsNone(self.prefilter.check('So relatable, but you are wrong'))
+
+    def test_stats(self):
+        self.prefilter.check('kys')
+        self.prefilter.check('+1')
+        self.prefilter.check('I think you have valid point on this topic.')
+        self.prefilter.check('Another ambiguous comment')
+
+        stats = self.prefilter.stats()
+        self.assertEqual(stats['checks'], 4)
+        self.assertEqual(stats['resolved_ratio'], 0.5)
+        self.assertGreater(stats['avg_cost_us'], 0)
+
+    def test_prefilter_short_circuits_model(self):
+        with mock.patch.object(get_ai_provider('gemini'), 'model') as ai_model:
+            self.assertEqual(ai_verify_safety_batch(['kys', 'So relatable']), [False, True])
+            ai_model.generate_content.assert_not_called()
+
+
 class PostsAPINoAuthTestCase(TestCase):
     def setUp(self):
         self.post_data = {
@@ -61,6 +455,7 @@ class PostsAPINoAuthTestCase(TestCase):
         assert response.status_code == HTTP_401_UNAUTHORIZED
 
 
+@override_settings(AI_PROVIDER='local', AI_PROVIDERS=TEST_AI_PROVIDERS)
 class PostAPITestCase(TestCase):
     def setUp(self):
         self.path = '/api/blog/create-post'
@@ -94,6 +489,7 @@ class PostAPITestCase(TestCase):
         self.assertEqual(Post.objects.count(), 0)
 
 
+@override_settings(AI_PROVIDER='local', AI_PROVIDERS=TEST_AI_PROVIDERS)
 class CommentAPITestCase(TestCase):
     def setUp(self):
         self.user = User(
@@ -133,97 +529,1297 @@ class CommentAPITestCase(TestCase):
         self.assertEqual(Comment.objects.filter(is_blocked=True).count(), 1)
 
 
-class AnalyticsAPITestCase(TestCase):
+@override_settings(DEFERRED_MODERATION=True)
+class DeferredModerationTestCase(FakeModerationMixin, TestCase):
+    unsafe_word = 'dead'
+
     def setUp(self):
-        self.user = User(
-            username = 'test_username',
-            auto_post_reply = None
+        super().setUp()
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(
+            title = 'Test post title',
+            content = 'Test content',
+            user = self.user
+        )
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def _create_comment(self, content):
+        with mock.patch('blog.api.moderate_comment') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.api_client.post(
+                f'/api/blog/post/{self.post.id}/create-comment', {'content': content}, format='json'
+            )
+        comment_id = json.loads(response.content)['id']
+        task.delay.assert_called_once_with(comment_id=comment_id)
+        return response, comment_id
+
+    def _visible_comment_ids(self):
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}/comments')
+        return [comment['id'] for comment in json.loads(response.content)['items']]
+
+    def test_comment_is_pending_until_moderated(self):
+        response, comment_id = self._create_comment('that was pretty useful')
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(json.loads(response.content)['moderation_status'], ModerationStatus.PENDING)
+        self.ai_model.generate_content.assert_not_called()
+        self.assertEqual(self._visible_comment_ids(), [])
+
+        moderate_comment(comment_id=comment_id)
+
+        status = self.api_client.get(f'/api/blog/comment/{comment_id}/moderation-status')
+        self.assertEqual(json.loads(status.content)['moderation_status'], ModerationStatus.APPROVED)
+        self.assertEqual(self._visible_comment_ids(), [comment_id])
+
+    def test_blocked_comment_is_never_shown(self):
+        _, comment_id = self._create_comment('You should be dead already')
+
+        moderate_comment(comment_id=comment_id)
+
+        comment = Comment.objects.get(id=comment_id)
+        self.assertEqual(comment.moderation_status, ModerationStatus.BLOCKED)
+        self.assertTrue(comment.is_blocked)
+        self.assertEqual(self._visible_comment_ids(), [])
+
+    def test_pending_post_is_hidden_from_listing(self):
+        with mock.patch('blog.api.moderate_post') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.api_client.post(
+                '/api/blog/create-post', {'title': 'Pending title', 'content': 'Pending content'}, format='json'
+            )
+        post_id = json.loads(response.content)['id']
+        task.delay.assert_called_once_with(post_id=post_id)
+
+        listed = [post['id'] for post in json.loads(self.api_client.get('/api/blog/post-list').content)['items']]
+        self.assertNotIn(post_id, listed)
+        self.assertEqual(self.api_client.get(f'/api/blog/post/{post_id}').status_code, HTTP_400_BAD_REQUEST)
+
+        moderate_post(post_id=post_id)
+
+        listed = [post['id'] for post in json.loads(self.api_client.get('/api/blog/post-list').content)['items']]
+        self.assertIn(post_id, listed)
+
+    def test_edit_during_moderation_discards_verdict(self):
+        post = Post.objects.create(
+            title='Title', content='Safe content', user=self.user, moderation_status=ModerationStatus.PENDING
         )
+
+        def edit_while_checking(texts):
+            Post.objects.filter(id=post.id).update(content='You should be dead already')
+            return [True] * len(texts)
+
+        with mock.patch('blog.tasks.ai_verify_safety_batch', side_effect=edit_while_checking):
+            moderate_post(post_id=post.id)
+
+        self.assertEqual(Post.objects.get(id=post.id).moderation_status, ModerationStatus.PENDING)
+
+    def test_comment_edit_during_moderation_discards_verdict(self):
+        _, comment_id = self._create_comment('that was pretty useful')
+
+        def edit_while_checking(text):
+            Comment.objects.filter(id=comment_id).update(content='You should be dead already')
+            return True
+
+        with mock.patch('blog.tasks.ai_verify_safety', side_effect=edit_while_checking):
+            moderate_comment(comment_id=comment_id)
+
+        self.assertEqual(Comment.objects.get(id=comment_id).moderation_status, ModerationStatus.PENDING)
+        self.assertEqual(self._visible_comment_ids(), [])
+
+
+class BulkCreateAPITestCase(FakeModerationMixin, TestCase):
+    unsafe_word = 'dead'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User(username = 'test_username', auto_post_reply = 10)
         self.user.set_password('test_pass')
         self.user.save()
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
 
         self.api_client = APIClient()
         self.access_token = str(RefreshToken.for_user(self.user).access_token)
         self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
 
+    def test_bulk_create_posts(self):
+        items = [
+            {'title': 'First post', 'content': 'Nice weather today'},
+            {'title': 'Second post', 'content': 'I wish you were dead'},
+            {'title': 'Third post', 'content': 'Lunch was great'},
+        ]
+
+        response = self.api_client.post('/api/blog/bulk/create-posts', {'items': items}, format='json')
+        results = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual([result['blocked'] for result in results], [False, True, False])
+        self.assertIsNone(results[1]['id'])
+        self.assertEqual(
+            list(Post.objects.filter(id__in=[results[0]['id'], results[2]['id']]).values_list('title', flat=True)),
+            ['First post', 'Third post']
+        )
+        self.assertFalse(Post.objects.filter(title='Second post').exists())
+
+    def test_bulk_create_comments(self):
+        items = [{'content': f'Comment {i}'} for i in range(5)] + [{'content': 'drop dead'}]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api_client.post(
+                f'/api/blog/post/{self.post.id}/bulk/create-comments', {'items': items}, format='json'
+            )
+        results = json.loads(response.content)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "blog_comment"')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual([result['blocked'] for result in results], [False] * 5 + [True])
+        comments = Comment.objects.filter(id__in=[result['id'] for result in results]).order_by('id')
+        self.assertEqual([comment.respond_at is not None for comment in comments], [True] * 5 + [False])
+        self.assertEqual(comments[5].moderation_status, ModerationStatus.BLOCKED)
+        self.assertEqual(CommentDailyStats.objects.get(is_blocked=True).count, 1)
+        # One call for the whole batch, then halving down to the harmful comment (3 levels for 6 items).
+        self.assertLessEqual(self.ai_model.generate_content.call_count, 1 + 2 * 3)
+
+    @override_settings(DEFERRED_MODERATION=True)
+    def test_bulk_create_comments_deferred(self):
+        items = [{'content': f'Comment {i}'} for i in range(3)]
+
+        with mock.patch('blog.api.moderate_comments') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.api_client.post(
+                f'/api/blog/post/{self.post.id}/bulk/create-comments', {'items': items}, format='json'
+            )
+        results = json.loads(response.content)
+        comment_ids = [result['id'] for result in results]
+
+        self.assertEqual({result['moderation_status'] for result in results}, {ModerationStatus.PENDING})
+        task.delay.assert_called_once_with(comment_ids=comment_ids)
+        self.ai_model.generate_content.assert_not_called()
+
+        moderate_comments(comment_ids=comment_ids)
+
+        self.assertEqual(self.ai_model.generate_content.call_count, 1)
+        self.assertEqual(
+            set(Comment.objects.filter(id__in=comment_ids).values_list('moderation_status', flat=True)),
+            {ModerationStatus.APPROVED}
+        )
+
+    @override_settings(DEFERRED_MODERATION=True)
+    def test_bulk_create_posts_deferred(self):
+        items = [
+            {'title': 'First post', 'content': 'Nice weather today'},
+            {'title': 'Second post', 'content': 'I wish you were dead'},
+        ]
+
+        with mock.patch('blog.api.moderate_posts') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.api_client.post('/api/blog/bulk/create-posts', {'items': items}, format='json')
+        post_ids = [result['id'] for result in json.loads(response.content)]
+
+        task.delay.assert_called_once_with(post_ids=post_ids)
+
+        moderate_posts(post_ids=post_ids)
+
+        self.assertEqual(
+            [Post.objects.get(id=post_id).moderation_status for post_id in post_ids],
+            [ModerationStatus.APPROVED, ModerationStatus.BLOCKED]
+        )
+
+    def test_bulk_size_limit(self):
+        items = [{'content': 'Comment'}] * (MAX_BULK_SIZE + 1)
+
+        response = self.api_client.post(
+            f'/api/blog/post/{self.post.id}/bulk/create-comments', {'items': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Comment.objects.exists())
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
         self.post = Post.objects.create(
             title = 'Test post title',
             content = 'Test content',
             user = self.user
         )
 
-        self.comment_content = 'Test comment content'
-        self.generated_by_ai = 3
-        self.days_amount = [21, 8, 11]
-        self.days_blocked_amount = [5, 1, 3]
-        self.days_dates = [
-            date(year=2024, month=6, day=1),
-            date(year=2024, month=6, day=2),
-            date(year=2024, month=6, day=3)
-        ]
-        self.data = {
-            'date_from': self.days_dates[0],
-            'date_to': self.days_dates[-1]
-        }
+        # Rows sharing a timestamp make sure ties are broken by id.
+        self.comments = []
+        for day in (1, 1, 1, 2, 2, 3, 4):
+            with freeze_time(f'2024-06-0{day} 12:00:00'):
+                self.comments.append(Comment.objects.create(content='Test comment', post=self.post, user=self.user))
 
-        self.comments_by_day = []
-        for days, day_date in zip(self.days_amount, self.days_dates):
-            freezer = freeze_time(str(day_date))
-            freezer.start()
-    
-            self.comments_by_day.append(
-                Comment.objects.bulk_create(self._create_comments_list(days))
-            )
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
 
-            freezer.stop()
+    def test_pages_cover_all_rows_in_order(self):
+        path = f'/api/blog/post/{self.post.id}/comments'
+        seen = []
+        cursor = None
 
-        # Blocking some comments
-        for comment_list, blocked_amount in zip(self.comments_by_day, self.days_blocked_amount):
-            for i in range(blocked_amount):
-                comment_list[i].is_blocked = True
-                comment_list[i].save()
-        
-        # Mark some comments as generated by ai
-        for comment_list in self.comments_by_day:
-            reversed_comments = comment_list[::-1]
-            counter = 0
-            while counter < self.generated_by_ai:
-                reversed_comments[counter].generated_by_ai = True
-                reversed_comments[counter].save()
-                counter += 1
-    
-    def _create_comments_list(self, count: int):
-        comments = []
+        while True:
+            params = {'limit': 3} if cursor is None else {'limit': 3, 'cursor': cursor}
+            page = json.loads(self.api_client.get(path, params).content)
+            seen += [comment['id'] for comment in page['items']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
 
-        for _ in range(count):
-            comments.append(Comment(content=self.comment_content, user=self.user, post=self.post))
-        
-        return comments
-    
-    def test_analytics(self):
-        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
-        daily_analytics = json.loads(response.content)
+        expected = sorted(self.comments, key=lambda comment: (comment.created_at, comment.id), reverse=True)
+        self.assertEqual(seen, [comment.id for comment in expected])
 
-        self.assertEqual(response.status_code, HTTP_200_OK)
-        
-        for record, day, comments, blocked_comments in \
-                zip(daily_analytics, self.days_dates, self.days_amount, self.days_blocked_amount):
-            self.assertEqual(record['day'], str(day))
-            self.assertEqual(record['total_comments'], comments)
-            self.assertEqual(record['blocked_comments'], blocked_comments)
-    
-    def test_analytics_excluding_ai(self):
-        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown/exclude-ai', self.data, format='json')
-        daily_analytics = json.loads(response.content)
+    def test_page_size_is_bounded(self):
+        response = self.api_client.get('/api/blog/post-list', {'limit': 1000})
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_invalid_cursor(self):
+        response = self.api_client.get('/api/blog/post-list', {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Read endpoints must issue a fixed number of queries (one of them is the JWT user
+    lookup) however many rows they return.
+    """
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(content_cache.clear_local)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.authors = [User.objects.create(username=f'author_{i}') for i in range(5)]
+
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+        Post.objects.bulk_create([
+            Post(title=f'Post {i}', content='Test content', user=author)
+            for i, author in enumerate(self.authors * 4)
+        ])
+        Comment.objects.bulk_create([
+            Comment(content=f'Comment {i}', post=self.post, user=author)
+            for i, author in enumerate(self.authors * 4)
+        ])
+        self.comment = Comment.objects.filter(post=self.post).first()
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
 
+    def assertQueryBudget(self, path, budget, params=None):
+        with self.assertNumQueries(budget):
+            response = self.api_client.get(path, params or {'limit': 100})
         self.assertEqual(response.status_code, HTTP_200_OK)
-        
-        for record, day, comments, blocked_comments in \
-                zip(daily_analytics, self.days_dates, self.days_amount, self.days_blocked_amount):
-            self.assertEqual(record['day'], str(day))
-            self.assertEqual(record['total_comments'], comments - self.generated_by_ai)
-            self.assertEqual(record['blocked_comments'], blocked_comments)
+        return json.loads(response.content)
+
+    def test_retrieve_all_posts(self):
+        page = self.assertQueryBudget('/api/blog/post-list', 2)
+        self.assertEqual(len(page['items']), 21)
+
+    # List endpoints also run one aggregate for their ETag (see ConditionalGetTestCase).
+    def test_retrieve_user_posts(self):
+        page = self.assertQueryBudget(f'/api/blog/user/{self.authors[0].username}/posts', 3)
+        self.assertEqual(len(page['items']), 4)
+
+    def test_retrieve_post_comments(self):
+        page = self.assertQueryBudget(f'/api/blog/post/{self.post.id}/comments', 4)
+        self.assertEqual(len(page['items']), 20)
+        self.assertEqual({comment['post_id'] for comment in page['items']}, {self.post.id})
+
+    def test_stream_post_comments(self):
+        with self.assertNumQueries(3):
+            response = self.api_client.get(f'/api/blog/post/{self.post.id}/comments/stream')
+            comments = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0]['user']['username'], self.authors[-1].username)
+
+    def test_stream_all_posts(self):
+        with mock.patch('blog.streaming.STREAM_CHUNK_SIZE', 4):
+            response = self.api_client.get('/api/blog/post-list/stream')
+            chunks = list(response.streaming_content)
+
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(json.loads(b''.join(chunks))), 21)
+
+    # Cold cache: the row and its author, which is cached separately (see ContentCacheTestCase).
+    def test_retrieve_post(self):
+        self.assertQueryBudget(f'/api/blog/post/{self.post.id}', 3, params={})
+
+    def test_retrieve_comment(self):
+        self.assertQueryBudget(f'/api/blog/comment/{self.comment.id}', 3, params={})
+
+
+class ContentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(content_cache.clear_local)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+        self.comment = Comment.objects.create(content='Test comment', post=self.post, user=self.user)
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def test_repeated_reads_skip_database(self):
+        self.api_client.get(f'/api/blog/post/{self.post.id}')
+        self.api_client.get(f'/api/blog/comment/{self.comment.id}')
+
+        # The authenticated user is cached as well.
+        with self.assertNumQueries(0):
+            response = self.api_client.get(f'/api/blog/post/{self.post.id}')
+        with self.assertNumQueries(0):
+            self.api_client.get(f'/api/blog/comment/{self.comment.id}')
+
+        self.assertEqual(json.loads(response.content)['title'], 'Test post title')
+        # The post and the comment, plus their author on every read but the first.
+        self.assertEqual(content_cache.stats()['local_hits'], 5)
+
+    def test_user_update_invalidates_author(self):
+        self.api_client.get(f'/api/blog/post/{self.post.id}')
+        self.api_client.get(f'/api/blog/comment/{self.comment.id}')
+
+        self.api_client.patch('/api/user/update-auto-reply?auto_post_reply=5')
+        post = json.loads(self.api_client.get(f'/api/blog/post/{self.post.id}').content)
+        comment = json.loads(self.api_client.get(f'/api/blog/comment/{self.comment.id}').content)
+
+        self.assertEqual(post['user']['auto_post_reply'], 5)
+        self.assertEqual(comment['user']['auto_post_reply'], 5)
+
+    def test_update_invalidates_post(self):
+        self.api_client.get(f'/api/blog/post/{self.post.id}')
+
+        self.api_client.patch(
+            f'/api/blog/post/{self.post.id}/update', {'title': 'New title', 'content': None}, format='json'
+        )
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}')
+
+        self.assertEqual(json.loads(response.content)['title'], 'New title')
+
+    def test_moderation_change_invalidates_post(self):
+        self.api_client.get(f'/api/blog/post/{self.post.id}')
+
+        Post.objects.filter(id=self.post.id).update(moderation_status=ModerationStatus.PENDING)
+        with mock.patch('blog.tasks.ai_verify_safety_batch', return_value=[False, True]):
+            moderate_post(post_id=self.post.id)
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}')
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_delete_invalidates_comment(self):
+        self.api_client.get(f'/api/blog/comment/{self.comment.id}')
+
+        self.api_client.delete(f'/api/blog/post/{self.post.id}/comment/{self.comment.id}')
+        response = self.api_client.get(f'/api/blog/comment/{self.comment.id}')
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_concurrent_misses_load_once(self):
+        loads = []
+
+        def slow_loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return {'id': 1}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            values = list(executor.map(lambda _: content_cache.get_or_set('herd', slow_loader), range(8)))
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(values, [{'id': 1}] * 8)
+
+
+class PostCommentCountersTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(content_cache.clear_local)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def _counters(self):
+        return Post.objects.values_list('comment_count', 'blocked_comment_count', 'ai_reply_count').get(id=self.post.id)
+
+    def test_create_block_and_delete(self):
+        comment = Comment.objects.create(content='Comment', post=self.post, user=self.user)
+        reply = Comment.objects.create(
+            content='Reply', post=self.post, user=self.user, generated_by_ai=True, is_response=True
+        )
+        Comment.objects.create(
+            content='Pending', post=self.post, user=self.user, moderation_status=ModerationStatus.PENDING
+        )
+        self.assertEqual(self._counters(), (2, 0, 1))
+        self.assertEqual(Post.objects.get(id=self.post.id).last_comment_at, reply.created_at)
+
+        comment.is_blocked = True
+        comment.moderation_status = ModerationStatus.BLOCKED
+        comment.save()
+        self.assertEqual(self._counters(), (1, 1, 1))
+
+        reply.delete()
+        comment.delete()
+        self.assertEqual(self._counters(), (0, 0, 0))
+
+    def test_delete_with_drifted_counters(self):
+        comments = [Comment.objects.create(content=f'Comment {i}', post=self.post, user=self.user) for i in range(3)]
+        Post.objects.filter(id=self.post.id).update(comment_count=0)
+
+        comments[0].delete()
+        self.assertEqual(self._counters(), (0, 0, 0))
+
+        with CaptureQueriesContext(connection) as queries:
+            Post.objects.get(id=self.post.id).delete()
+        self.assertFalse(Post.objects.filter(id=self.post.id).exists())
+        self.assertFalse([query for query in queries.captured_queries if query['sql'].startswith('UPDATE "blog_post"')])
+
+    def test_moderation_publishes_pending_comment(self):
+        comment = Comment.objects.create(
+            content='Pending', post=self.post, user=self.user, moderation_status=ModerationStatus.PENDING
+        )
+
+        with mock.patch('blog.tasks.ai_verify_safety', return_value=True):
+            moderate_comment(comment_id=comment.id)
+
+        self.assertEqual(self._counters(), (1, 0, 0))
+        self.assertEqual(Post.objects.get(id=self.post.id).last_comment_at, comment.created_at)
+
+    def test_bulk_create(self):
+        Comment.objects.bulk_create([
+            Comment(content='Comment', post=self.post, user=self.user),
+            Comment(
+                content='Blocked', post=self.post, user=self.user,
+                is_blocked=True, moderation_status=ModerationStatus.BLOCKED
+            ),
+            Comment(content='Reply', post=self.post, user=self.user, generated_by_ai=True, is_response=True),
+        ])
+
+        self.assertEqual(self._counters(), (2, 1, 1))
+
+    def test_post_output_and_cache(self):
+        self.api_client.get(f'/api/blog/post/{self.post.id}')
+        Comment.objects.create(content='Comment', post=self.post, user=self.user)
+
+        post = json.loads(self.api_client.get(f'/api/blog/post/{self.post.id}').content)
+        listed = json.loads(self.api_client.get('/api/blog/post-list').content)['items'][0]
+
+        self.assertEqual(post['comment_count'], 1)
+        self.assertEqual(listed['comment_count'], 1)
+        self.assertIsNotNone(listed['last_comment_at'])
+
+    def test_reconcile(self):
+        Comment.objects.create(content='Comment', post=self.post, user=self.user)
+        Comment.objects.create(content='Reply', post=self.post, user=self.user, generated_by_ai=True, is_response=True)
+        Post.objects.filter(id=self.post.id).update(comment_count=7, ai_reply_count=0, last_comment_at=None)
+        other = Post.objects.create(title='Other', content='Other', user=self.user)
+
+        out = StringIO()
+        call_command('reconcile_post_counters', batch_size=1, stdout=out)
+
+        self.assertEqual(self._counters(), (2, 0, 1))
+        self.assertIsNotNone(Post.objects.get(id=self.post.id).last_comment_at)
+        self.assertIn('1 of 2 posts', out.getvalue())
+        self.assertEqual(Post.objects.get(id=other.id).comment_count, 0)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        content_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(content_cache.clear_local)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+        Comment.objects.bulk_create([
+            Comment(content=f'Comment {i}', post=self.post, user=self.user) for i in range(3)
+        ])
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def test_post_not_modified(self):
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}')
+
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_post_modified_after_update(self):
+        etag = self.api_client.get(f'/api/blog/post/{self.post.id}')['ETag']
+
+        self.post.title = 'New title'
+        self.post.save()
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_comments_not_modified_without_loading_rows(self):
+        path = f'/api/blog/post/{self.post.id}/comments'
+        etag = self.api_client.get(path)['ETag']
+
+        # Post existence check and the aggregate (the user is cached by now); no page query.
+        with self.assertNumQueries(2):
+            response = self.api_client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_new_comment_changes_etag(self):
+        path = f'/api/blog/post/{self.post.id}/comments'
+        etag = self.api_client.get(path)['ETag']
+
+        Comment.objects.create(content='Another comment', post=self.post, user=self.user)
+        response = self.api_client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)['items']), 4)
+
+    def test_etag_depends_on_page(self):
+        path = f'/api/blog/post/{self.post.id}/comments'
+        etag = self.api_client.get(path, {'limit': 2})['ETag']
+
+        response = self.api_client.get(path, {'limit': 3}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_user_posts_modified_after_delete(self):
+        other = Post.objects.create(title='Other post', content='Other content', user=self.user)
+        path = f'/api/blog/user/{self.user.username}/posts'
+        etag = self.api_client.get(path)['ETag']
+
+        other.delete()
+        response = self.api_client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)['items']), 1)
+
+    def test_comments_modified_after_block(self):
+        path = f'/api/blog/post/{self.post.id}/comments'
+        etag = self.api_client.get(path)['ETag']
+
+        comment = Comment.objects.filter(post=self.post).first()
+        comment.is_blocked = True
+        comment.save()
+        response = self.api_client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(json.loads(response.content)['items']), 2)
+
+
+class SearchAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(title='Sourdough basics', content='Flour, water and patience.', user=self.user)
+        self.other_post = Post.objects.create(
+            title='Weekend notes', content='Baked a sourdough loaf and read a book.', user=self.user
+        )
+        self.comment = Comment.objects.create(content='My sourdough never rises', post=self.post, user=self.user)
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def search(self, **params):
+        response = self.api_client.get('/api/blog/search', params)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        return json.loads(response.content)
+
+    def test_ranked_results(self):
+        items = self.search(q='sourdough')['items']
+
+        self.assertEqual(len(items), 3)
+        self.assertEqual((items[0]['kind'], items[0]['id']), ('post', self.post.id))
+        self.assertEqual({(item['kind'], item['id']) for item in items[1:]}, {
+            ('post', self.other_post.id), ('comment', self.comment.id)
+        })
+        self.assertIn('<b>sourdough</b>', items[-1]['snippet'].lower())
+
+    def test_prefix_and_kind_filter(self):
+        items = self.search(q='sourd', kind='comment')['items']
+
+        self.assertEqual([(item['id'], item['post_id']) for item in items], [(self.comment.id, self.post.id)])
+
+    def test_index_follows_writes(self):
+        self.comment.is_blocked = True
+        self.comment.moderation_status = ModerationStatus.BLOCKED
+        self.comment.save()
+        Post.objects.filter(id=self.other_post.id).update(title='Weekend', content='Read a book.')
+        Post.objects.create(
+            title='Sourdough starter', content='pending', user=self.user, moderation_status=ModerationStatus.PENDING
+        )
+
+        self.assertEqual([item['id'] for item in self.search(q='sourdough')['items']], [self.post.id])
+
+        self.post.delete()
+        self.assertEqual(self.search(q='sourdough')['items'], [])
+
+    def test_comments_of_hidden_posts_are_not_found(self):
+        pending = Post.objects.create(
+            title='Draft', content='Draft content', user=self.user, moderation_status=ModerationStatus.PENDING
+        )
+        Comment.objects.create(content='sourdough question', post=pending, user=self.user)
+        Post.objects.filter(id=self.post.id).update(moderation_status=ModerationStatus.BLOCKED)
+
+        items = self.search(q='sourdough')['items']
+        self.assertEqual([(item['kind'], item['id']) for item in items], [('post', self.other_post.id)])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search(q='sourdough')['items'], items)
+
+        Post.objects.filter(id=pending.id).update(moderation_status=ModerationStatus.APPROVED)
+        items = self.search(q='sourdough question')['items']
+        self.assertEqual([(item['kind'], item['post_id']) for item in items], [('comment', pending.id)])
+
+    def test_pagination(self):
+        Comment.objects.bulk_create([
+            Comment(content=f'sourdough tip {i}', post=self.post, user=self.user) for i in range(7)
+        ])
+
+        seen = []
+        page = self.search(q='sourdough', limit=4)
+        seen += page['items']
+        while page['next_cursor']:
+            page = self.search(q='sourdough', limit=4, cursor=page['next_cursor'])
+            seen += page['items']
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len({(item['kind'], item['id']) for item in seen}), 10)
+        self.assertEqual([item['score'] for item in seen], sorted((item['score'] for item in seen), reverse=True))
+
+    def test_operators_are_not_interpreted(self):
+        self.assertEqual(self.search(q='sourdough" OR NEAR(')['items'], [])
+        self.assertEqual(self.search(q='"***"')['items'], [])
+
+    def test_base_tables_not_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search(q='sourdough')
+
+        search_queries = [query['sql'] for query in queries.captured_queries if 'blog_search' in query['sql']]
+        self.assertEqual(len(search_queries), 1)
+        self.assertNotIn('blog_post', search_queries[0])
+        self.assertNotIn('blog_comment', search_queries[0])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blog_search')
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(len(self.search(q='sourdough')['items']), 3)
+
+
+class CommentThreadTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+
+        self.top_level = [
+            Comment.objects.create(content=f'Top {i}', post=self.post, user=self.user) for i in range(3)
+        ]
+        self.chain = [self.top_level[0]]
+        for depth in range(1, 5):
+            self.chain.append(self._reply(self.chain[-1], f'Depth {depth}'))
+        self.siblings = [self._reply(self.top_level[1], f'Sibling {i}') for i in range(3)]
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+    def _reply(self, comment, content, **kwargs):
+        reply = Comment.objects.create(
+            content=content, post=self.post, user=self.user, is_response=True, **comment.reply_thread_fields(), **kwargs
+        )
+        CommentResponse.objects.create(comment=comment, response=reply)
+        return reply
+
+    def _thread(self, **params):
+        response = self.api_client.get(f'/api/blog/post/{self.post.id}/thread', params)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        return json.loads(response.content)
+
+    def _by_id(self, items, comment):
+        return next(item for item in items if item['id'] == comment.id)
+
+    def test_nested_tree_in_constant_queries(self):
+        # JWT user, post, page of top-level comments, all of their replies.
+        with self.assertNumQueries(4):
+            page = self._thread()
+
+        self.assertEqual(len(page['items']), 3)
+        node = self._by_id(page['items'], self.chain[0])
+        for depth, comment in enumerate(self.chain[1:], start=1):
+            self.assertEqual([reply['id'] for reply in node['replies']], [comment.id])
+            node = node['replies'][0]
+            self.assertEqual(node['depth'], depth)
+        self.assertEqual(node['replies'], [])
+
+        wide = self._by_id(page['items'], self.top_level[1])
+        self.assertEqual([reply['content'] for reply in wide['replies']], ['Sibling 0', 'Sibling 1', 'Sibling 2'])
+
+    def test_max_depth(self):
+        node = self._by_id(self._thread(max_depth=2)['items'], self.chain[0])
+
+        self.assertEqual(node['replies'][0]['replies'][0]['id'], self.chain[2].id)
+        self.assertEqual(node['replies'][0]['replies'][0]['replies'], [])
+
+    def test_blocked_reply_hides_subtree(self):
+        self.chain[2].is_blocked = True
+        self.chain[2].moderation_status = ModerationStatus.BLOCKED
+        self.chain[2].save()
+
+        node = self._by_id(self._thread()['items'], self.chain[0])
+
+        self.assertEqual(node['replies'][0]['replies'], [])
+
+    def test_top_level_pagination(self):
+        first = self._thread(limit=2)
+        second = self._thread(limit=2, cursor=first['next_cursor'])
+
+        self.assertEqual(
+            [item['id'] for item in first['items'] + second['items']],
+            [comment.id for comment in reversed(self.top_level)]
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    @override_settings(DEFERRED_MODERATION=True)
+    def test_reply_endpoint_links_tree(self):
+        with mock.patch('blog.api.moderate_comment'):
+            response = self.api_client.post(
+                f'/api/blog/post/{self.post.id}/comment/{self.chain[1].id}/reply', {'content': 'New reply'}, format='json'
+            )
+        reply = Comment.objects.get(id=json.loads(response.content)['id'])
+
+        self.assertEqual((reply.parent_id, reply.root_id, reply.depth), (self.chain[1].id, self.chain[0].id, 2))
+
+    def test_rebuild_comment_tree(self):
+        Comment.objects.update(parent=None, root=None, depth=0)
+
+        call_command('rebuild_comment_tree', stdout=StringIO())
+
+        self.assertEqual(
+            list(Comment.objects.filter(id__in=[c.id for c in self.chain]).order_by('depth').values_list('depth', 'root_id')),
+            [(0, None)] + [(depth, self.chain[0].id) for depth in range(1, 5)]
+        )
+        self.assertEqual(Comment.objects.get(id=self.siblings[0].id).parent_id, self.top_level[1].id)
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    Hot queries must be answered from an index: no full table scan and no temporary
+    b-tree for the ORDER BY of a page.
+    """
+    def setUp(self):
+        self.user = User.objects.create(username='test_username')
+        self.post = Post.objects.create(title='Test post title', content='Test content', user=self.user)
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'INDEX {index}', plan)
+        self.assertNotIn('SCAN blog_', plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_post_comments_page(self):
+        comments = _comments_for_output().filter(VISIBLE_COMMENT, post=self.post)
+        cursor = {'created_at__lte': timezone.now()}
+
+        self.assertUsesIndex(comments.order_by('-created_at', '-id')[:21], 'comment_visible_feed_idx')
+        self.assertUsesIndex(
+            comments.filter(**cursor).exclude(created_at=timezone.now(), id__gte=10).order_by('-created_at', '-id')[:21],
+            'comment_visible_feed_idx'
+        )
+
+    def test_post_comments_validators(self):
+        comments = _comments_for_output().filter(VISIBLE_COMMENT, post=self.post)
+        plan = comments.order_by().values('post').annotate(count=Count('id'), latest=Max('created_at')).explain()
+
+        self.assertIn('INDEX comment_visible_feed_idx', plan)
+
+    def test_user_posts_page(self):
+        posts = _posts_for_output().filter(user__username=self.user.username, moderation_status=ModerationStatus.APPROVED)
+
+        self.assertUsesIndex(posts.order_by('-created_at', '-id')[:21], 'post_user_feed_idx')
+
+    def test_analytics_range(self):
+        now = timezone.now()
+        comments = Comment.objects.filter(created_at__gte=now - timedelta(days=1), created_at__lt=now).values('user')
+        plan = comments.annotate(count=Count('id', filter=Q(is_blocked=True))).explain()
+
+        self.assertIn('COVERING INDEX comment_analytics_idx', plan)
+        self.assertNotIn('SCAN blog_', plan)
+
+
+class SQLiteBackendTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+            'OPTIONS': {**connection.settings_dict['OPTIONS'], 'timeout': 0},
+        }
+
+    def _connect(self):
+        wrapper = SQLiteDatabaseWrapper(self.settings_dict, alias='sqlite_backend_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_applied(self):
+        with self._connect().cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_transaction_takes_write_lock_immediately(self):
+        writer, other_writer = self._connect(), self._connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+
+        # What `atomic` runs on SQLite; with the default DEFERRED mode no lock is held yet.
+        writer._start_transaction_under_autocommit()
+        try:
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                other_writer.cursor().execute('BEGIN IMMEDIATE')
+        finally:
+            writer.cursor().execute('ROLLBACK')
+
+
+class AsyncBlogAPITestCase(FakeModerationMixin, TestCase):
+    unsafe_word = 'kill'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(
+            title = 'Test post title',
+            content = 'Test content',
+            user = self.user
+        )
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client = AsyncClient()
+        self.headers = {'Authorization': 'Bearer ' + access_token}
+
+    async def test_create_safe_post(self):
+        data = {'title': 'Async post title', 'content': 'Async post content'}
+        response = await self.api_client.post(
+            '/api/blog/async/create-post', data, content_type='application/json', headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(await Post.objects.filter(title=data['title']).acount(), 1)
+        self.assertEqual(self.ai_model.generate_content_async.await_count, 1)
+
+    async def test_create_unsafe_comment(self):
+        path = f'/api/blog/async/post/{self.post.id}/create-comment'
+        response = await self.api_client.post(
+            path, {'content': 'You can kill yourself.'}, content_type='application/json', headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(await Comment.objects.filter(is_blocked=True).acount(), 1)
+
+    async def test_update_post(self):
+        path = f'/api/blog/async/post/{self.post.id}/update'
+        response = await self.api_client.patch(
+            path, {'title': None, 'content': 'Updated content'}, content_type='application/json', headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['content'], 'Updated content')
+
+
+class DueReplySchedulerTestCase(TestCase):
+    def setUp(self):
+        self.user = User(username = 'test_username', auto_post_reply = 5)
+        self.user.set_password('test_pass')
+        self.user.save()
+        self.post = Post.objects.create(
+            title = 'Test post title',
+            content = 'Test content',
+            user = self.user
+        )
+
+    def test_comment_save_schedules_reply(self):
+        with freeze_time('2024-06-01 12:00:00'):
+            comment = Comment.objects.create(content='Test comment', post=self.post, user=self.user)
+
+        self.assertEqual(comment.respond_at.isoformat(), '2024-06-01T12:05:00+00:00')
+        self.assertIsNone(comment.reply_dispatched_at)
+
+    def test_blocked_and_ai_comments_are_not_scheduled(self):
+        blocked = Comment.objects.create(content='Test comment', post=self.post, user=self.user, is_blocked=True)
+        ai_reply = Comment.objects.create(content='Test reply', post=self.post, user=self.user, generated_by_ai=True)
+
+        self.assertIsNone(blocked.respond_at)
+        self.assertIsNone(ai_reply.respond_at)
+
+    @mock.patch('blog.tasks.auto_comment_response_batch')
+    def test_sweeper_dispatches_only_due_replies_once(self, auto_comment_response_batch):
+        with freeze_time('2024-06-01 12:00:00'):
+            due = Comment.objects.create(content='Due comment', post=self.post, user=self.user)
+        with freeze_time('2024-06-01 12:04:00'):
+            Comment.objects.create(content='Not yet due', post=self.post, user=self.user)
+
+        with freeze_time('2024-06-01 12:06:00'):
+            dispatch_due_replies()
+            dispatch_due_replies()
+
+        auto_comment_response_batch.delay.assert_called_once_with(comment_ids=[due.id])
+        self.assertIsNotNone(Comment.objects.get(id=due.id).reply_dispatched_at)
+
+    @mock.patch('blog.tasks.auto_comment_response_batch')
+    def test_backfill_reply_dispatch(self, auto_comment_response_batch):
+        with freeze_time('2024-06-01 12:00:00'):
+            answered = Comment.objects.create(content='Answered', post=self.post, user=self.user)
+            waiting = Comment.objects.create(content='Waiting', post=self.post, user=self.user)
+        schedule = CrontabSchedule.objects.create(minute='5', hour='12', day_of_month='1', month_of_year='6')
+        legacy = PeriodicTask.objects.create(
+            name=f'reply-{waiting.id}', task='blog.tasks.auto_comment_response', crontab=schedule, one_off=True,
+            kwargs=json.dumps({'user_id': self.user.id, 'comment_id': waiting.id})
+        )
+
+        with freeze_time('2024-06-01 12:06:00'):
+            call_command('backfill_reply_dispatch', stdout=StringIO())
+            dispatch_due_replies()
+
+        legacy.refresh_from_db()
+        self.assertFalse(legacy.enabled)
+        auto_comment_response_batch.delay.assert_called_once_with(comment_ids=[waiting.id])
+        self.assertIsNotNone(Comment.objects.get(id=answered.id).reply_dispatched_at)
+
+    def test_batch_reply(self):
+        comments = [
+            Comment.objects.create(content=f'Comment {i}', post=self.post, user=self.user) for i in range(3)
+        ]
+        Comment.objects.update(reply_dispatched_at=comments[0].created_at)
+
+        def fake_reply(content):
+            if content == 'Comment 1':
+                raise ThrottledError('quota exceeded', retry_after=1)
+            return f'Reply to {content}'
+
+        # 6 for the batch itself, 4 for opening today's AI-reply bucket in CommentDailyStats,
+        # 1 for the post's comment counters.
+        with mock.patch('blog.tasks.get_ai_response', side_effect=fake_reply), self.assertNumQueries(11):
+            auto_comment_response_batch(comment_ids=[comment.id for comment in comments])
+
+        replies = Comment.objects.filter(generated_by_ai=True, is_response=True).order_by('content')
+        self.assertEqual([reply.content for reply in replies], ['Reply to Comment 0', 'Reply to Comment 2'])
+        self.assertEqual(CommentResponse.objects.count(), 2)
+        self.assertIsNone(Comment.objects.get(id=comments[1].id).reply_dispatched_at)
+
+    def test_failed_reply_backs_off_then_gives_up(self):
+        comment = Comment.objects.create(content='Comment', post=self.post, user=self.user)
+        throttled = ThrottledError('quota exceeded', retry_after=1)
+
+        with freeze_time('2024-06-01 12:00:00'), mock.patch('blog.tasks.get_ai_response', side_effect=throttled):
+            for attempt in range(1, AUTO_REPLY_MAX_ATTEMPTS + 1):
+                Comment.objects.filter(id=comment.id).update(reply_dispatched_at=timezone.now())
+                auto_comment_response_batch(comment_ids=[comment.id])
+
+                comment.refresh_from_db()
+                self.assertEqual(comment.reply_attempts, attempt)
+                if attempt == 1:
+                    self.assertEqual(comment.respond_at.isoformat(), '2024-06-01T12:01:00+00:00')
+                if attempt == 2:
+                    self.assertEqual(comment.respond_at.isoformat(), '2024-06-01T12:02:00+00:00')
+
+        # Still claimed after the last attempt: the sweeper does not pick it up again.
+        self.assertIsNotNone(comment.reply_dispatched_at)
+
+    def test_unexpected_reply_error_is_raised_after_saving_batch(self):
+        comments = [
+            Comment.objects.create(content=f'Comment {i}', post=self.post, user=self.user) for i in range(2)
+        ]
+
+        def fake_reply(content):
+            if content == 'Comment 1':
+                raise ValueError('bad response')
+            return f'Reply to {content}'
+
+        with mock.patch('blog.tasks.get_ai_response', side_effect=fake_reply), self.assertRaises(ValueError):
+            auto_comment_response_batch(comment_ids=[comment.id for comment in comments])
+
+        self.assertEqual(CommentResponse.objects.get().comment_id, comments[0].id)
+        self.assertEqual(Comment.objects.get(id=comments[1].id).reply_attempts, 1)
+
+
+class AnalyticsAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        daily_stats_cache.reset_stats()
+        self.addCleanup(cache.clear)
+
+        self.user = User(
+            username = 'test_username',
+            auto_post_reply = None
+        )
+        self.user.set_password('test_pass')
+        self.user.save()
+
+        self.api_client = APIClient()
+        self.access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.api_client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token)
+
+        self.post = Post.objects.create(
+            title = 'Test post title',
+            content = 'Test content',
+            user = self.user
+        )
+
+        self.comment_content = 'Test comment content'
+        self.generated_by_ai = 3
+        self.days_amount = [21, 8, 11]
+        self.days_blocked_amount = [5, 1, 3]
+        self.days_dates = [
+            date(year=2024, month=6, day=1),
+            date(year=2024, month=6, day=2),
+            date(year=2024, month=6, day=3)
+        ]
+        self.data = {
+            'date_from': self.days_dates[0],
+            'date_to': self.days_dates[-1]
+        }
+
+        self.comments_by_day = []
+        for days, day_date in zip(self.days_amount, self.days_dates):
+            freezer = freeze_time(str(day_date))
+            freezer.start()
     
+            self.comments_by_day.append(
+                Comment.objects.bulk_create(self._create_comments_list(days))
+            )
+
+            freezer.stop()
+
+        # Blocking some comments
+        for comment_list, blocked_amount in zip(self.comments_by_day, self.days_blocked_amount):
+            for i in range(blocked_amount):
+                comment_list[i].is_blocked = True
+                comment_list[i].save()
+        
+        # Mark some comments as generated by ai
+        for comment_list in self.comments_by_day:
+            reversed_comments = comment_list[::-1]
+            counter = 0
+            while counter < self.generated_by_ai:
+                reversed_comments[counter].generated_by_ai = True
+                reversed_comments[counter].save()
+                counter += 1
+    
+    def _create_comments_list(self, count: int):
+        comments = []
+
+        for _ in range(count):
+            comments.append(Comment(content=self.comment_content, user=self.user, post=self.post))
+        
+        return comments
+    
+    def test_analytics(self):
+        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
+        daily_analytics = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        
+        for record, day, comments, blocked_comments in \
+                zip(daily_analytics, self.days_dates, self.days_amount, self.days_blocked_amount):
+            self.assertEqual(record['day'], str(day))
+            self.assertEqual(record['total_comments'], comments)
+            self.assertEqual(record['blocked_comments'], blocked_comments)
+    
+    def test_analytics_excluding_ai(self):
+        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown/exclude-ai', self.data, format='json')
+        daily_analytics = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        
+        for record, day, comments, blocked_comments in \
+                zip(daily_analytics, self.days_dates, self.days_amount, self.days_blocked_amount):
+            self.assertEqual(record['day'], str(day))
+            self.assertEqual(record['total_comments'], comments - self.generated_by_ai)
+            self.assertEqual(record['blocked_comments'], blocked_comments)
+    
+    def test_analytics_excluding_responses(self):
+        response_comment = self.comments_by_day[0][-1]
+        response_comment.is_response = True
+        response_comment.save()
+
+        response = self.api_client.get(
+            '/api/blog/analytics/comments-daily-breakdown/exclude-responses', self.data, format='json'
+        )
+        daily_analytics = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(daily_analytics[0]['total_comments'], self.days_amount[0] - 1)
+        self.assertEqual(daily_analytics[1]['total_comments'], self.days_amount[1])
+
+    def test_rollup_follows_deletes_and_rebuild(self):
+        self.comments_by_day[0][0].delete()
+        self.comments_by_day[1][-1].delete()
+        expected = list(
+            CommentDailyStats.objects.order_by('day', 'generated_by_ai', 'is_response', 'is_blocked')
+            .filter(count__gt=0).values_list('day', 'generated_by_ai', 'is_response', 'is_blocked', 'count')
+        )
+
+        CommentDailyStats.objects.all().delete()
+        call_command('rebuild_comment_stats', stdout=StringIO())
+
+        rebuilt = list(
+            CommentDailyStats.objects.order_by('day', 'generated_by_ai', 'is_response', 'is_blocked')
+            .values_list('day', 'generated_by_ai', 'is_response', 'is_blocked', 'count')
+        )
+        self.assertEqual(rebuilt, expected)
+        self.assertEqual(sum(row[-1] for row in rebuilt), sum(self.days_amount) - 2)
+
+    def test_analytics_query_does_not_touch_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
+
+        self.assertFalse(any('"blog_comment"' in query['sql'] for query in queries.captured_queries))
+
+    def test_closed_days_served_from_cache(self):
+        self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
+
+        # The authenticated user is cached and so is every day of the range.
+        with self.assertNumQueries(0):
+            response = self.api_client.get(
+                '/api/blog/analytics/comments-daily-breakdown/ai-only', self.data, format='json'
+            )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([record['total_comments'] for record in json.loads(response.content)], [3, 3, 3])
+        self.assertEqual(daily_stats_cache.stats()['hits'], len(self.days_dates))
+        self.assertEqual(daily_stats_cache.stats()['recomputes'], 1)
+
+    def test_comment_write_invalidates_cached_day(self):
+        self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comments_by_day[1][0].delete()
+        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown', self.data, format='json')
+        daily_analytics = json.loads(response.content)
+
+        self.assertEqual(daily_analytics[1]['total_comments'], self.days_amount[1] - 1)
+        self.assertEqual(daily_analytics[0]['total_comments'], self.days_amount[0])
+        self.assertEqual(daily_stats_cache.stats()['misses'], len(self.days_dates) + 1)
+
+    def test_today_is_not_cached(self):
+        today = timezone.localdate()
+        Comment.objects.create(content=self.comment_content, user=self.user, post=self.post)
+        data = {'date_from': today, 'date_to': today}
+
+        self.api_client.get('/api/blog/analytics/comments-daily-breakdown', data, format='json')
+        Comment.objects.create(content=self.comment_content, user=self.user, post=self.post)
+        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown', data, format='json')
+
+        self.assertEqual(json.loads(response.content)[0]['total_comments'], 2)
+        self.assertEqual(daily_stats_cache.stats()['hits'], 0)
+
+    def test_combined_breakdown(self):
+        # The authenticated user and the breakdown itself.
+        with self.assertNumQueries(2):
+            response = self.api_client.get('/api/blog/analytics/comments-breakdown', self.data, format='json')
+        breakdown = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([record['period'] for record in breakdown], [str(day) for day in self.days_dates])
+        for record, comments, blocked_comments in zip(breakdown, self.days_amount, self.days_blocked_amount):
+            self.assertEqual(record['total_comments'], comments)
+            self.assertEqual(record['blocked_comments'], blocked_comments)
+            self.assertEqual(record['published_comments'], comments - blocked_comments)
+            self.assertEqual(record['ai_comments'], self.generated_by_ai)
+            self.assertEqual(record['human_comments'], comments - self.generated_by_ai)
+            self.assertEqual(record['non_response_comments'], comments)
+
+    def test_inverted_range_is_rejected(self):
+        data = {'date_from': self.days_dates[-1], 'date_to': self.days_dates[0]}
+
+        for path in ['/api/blog/analytics/comments-daily-breakdown', '/api/blog/analytics/comments-breakdown']:
+            response = self.api_client.get(path, data, format='json')
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(daily_stats_cache.stats()['recomputes'], 0)
+
+    def test_too_long_range_is_rejected(self):
+        data = {
+            'date_from': self.days_dates[0],
+            'date_to': self.days_dates[0] + timedelta(days=ANALYTICS_MAX_RANGE_DAYS)
+        }
+
+        for path in ['/api/blog/analytics/comments-daily-breakdown', '/api/blog/analytics/comments-breakdown']:
+            response = self.api_client.get(path, data, format='json')
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+        data['date_to'] -= timedelta(days=1)
+        response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown', data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_combined_breakdown_by_month(self):
+        response = self.api_client.get(
+            '/api/blog/analytics/comments-breakdown', {**self.data, 'granularity': 'month'}, format='json'
+        )
+        breakdown = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(breakdown), 1)
+        self.assertEqual(breakdown[0]['period'], '2024-06-01')
+        self.assertEqual(breakdown[0]['total_comments'], sum(self.days_amount))
+        self.assertEqual(breakdown[0]['blocked_comments'], sum(self.days_blocked_amount))
+
+    def test_combined_breakdown_hourly_per_author(self):
+        with self.assertNumQueries(2):
+            response = self.api_client.get(
+                '/api/blog/analytics/comments-breakdown',
+                {**self.data, 'granularity': 'hour', 'group_by': 'user'}, format='json'
+            )
+        breakdown = json.loads(response.content)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(breakdown), len(self.days_dates))
+        self.assertEqual({record['user_id'] for record in breakdown}, {self.user.id})
+        self.assertEqual([record['total_comments'] for record in breakdown], self.days_amount)
+        self.assertTrue(breakdown[0]['period'].startswith('2024-06-01T00:00:00'))
+
     def test_analytics_ai_only(self):
         response = self.api_client.get('/api/blog/analytics/comments-daily-breakdown/ai-only', self.data, format='json')
         daily_analytics = json.loads(response.content)
@@ -1,15 +1,15 @@
 from ninja_extra import api_controller, route
-from ninja_jwt.authentication import JWTAuth
 from pydantic import PositiveInt
 from rest_framework.status import HTTP_201_CREATED, HTTP_200_OK
 
+from .authentication import CachedJWTAuth
 from .models import User
 from .schemas import UserInputSchema, UserOutputSchema
 
 
 @api_controller('/user')
 class UserController:
-    @route.get('/', auth=JWTAuth(), response={HTTP_200_OK: UserOutputSchema})
+    @route.get('/', auth=CachedJWTAuth(), response={HTTP_200_OK: UserOutputSchema})
     def retrieve_user(self, request):
         return request.user
 
@@ -20,8 +20,8 @@ class UserController:
         user.save()
         return user
 
-    @route.patch('/update-auto-reply', auth=JWTAuth(), response={HTTP_200_OK: UserOutputSchema})
+    @route.patch('/update-auto-reply', auth=CachedJWTAuth(), response={HTTP_200_OK: UserOutputSchema})
     def update_auto_reply(self, request, auto_post_reply: PositiveInt):
         request.user.auto_post_reply = auto_post_reply
-        request.user.save()
+        request.user.save(update_fields=['auto_post_reply'])
         return request.user
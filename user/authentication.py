@@ -0,0 +1,56 @@
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from ninja_jwt.authentication import JWTAuth, AsyncJWTAuth
+from ninja_jwt.exceptions import AuthenticationFailed, InvalidToken
+from ninja_jwt.settings import api_settings
+
+from ai_blog.cache import TieredCache
+from ai_blog.settings import AUTH_USER_CACHE_ALIAS, AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_LOCAL_TTL, AUTH_USER_CACHE_TTL
+
+
+user_cache = TieredCache(
+    prefix = 'auth-user',
+    maxsize = AUTH_USER_CACHE_SIZE,
+    local_ttl = AUTH_USER_CACHE_LOCAL_TTL,
+    shared_ttl = AUTH_USER_CACHE_TTL,
+    alias = AUTH_USER_CACHE_ALIAS
+)
+
+
+class CachedUserMixin:
+    """
+    Looks the token's user up in `user_cache` before the database. Only USER_CACHE_FIELDS
+    are cached (never the password hash): the user is rebuilt with the other fields
+    deferred, so saving it cannot write stale values back. Entries are dropped whenever
+    the user is saved or deleted (see `user.signals`).
+    """
+    USER_CACHE_FIELDS = ('id', 'username', 'auto_post_reply', 'is_active', 'is_staff', 'is_superuser')
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        values = user_cache.get(user_id)
+        if values is None:
+            user = super().get_user(validated_token)
+            values = {field: getattr(user, field) for field in self.USER_CACHE_FIELDS}
+            user_cache.set(user_id, values)
+        elif not values['is_active']:
+            raise AuthenticationFailed(_('User is inactive'))
+
+        # A new instance per request (handlers may modify `request.user`); `from_db`
+        # expects the loaded fields in model order.
+        fields = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in values]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), fields, [values[field] for field in fields]
+        )
+
+
+class CachedJWTAuth(CachedUserMixin, JWTAuth):
+    pass
+
+
+class AsyncCachedJWTAuth(CachedUserMixin, AsyncJWTAuth):
+    pass
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Again after commit: a concurrent request may have cached the old row in between.
+    user_cache.delete(instance.pk)
+    transaction.on_commit(lambda: user_cache.delete(instance.pk))
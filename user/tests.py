@@ -1,8 +1,12 @@
 import  json
 
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.test import TestCase, Client
+from ninja_jwt.tokens import RefreshToken
 from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_401_UNAUTHORIZED
 
+from .authentication import user_cache
 from .models import User
 
 
@@ -90,3 +94,61 @@ class AuthenticationAPITestCase(TestCase):
         response = self.client.post(self.verify_token_path, data, content_type='application/json')
         
         self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+
+
+class CachedJWTAuthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(user_cache.clear_local)
+
+        self.user = User(username = 'test_username')
+        self.user.set_password('test_pass')
+        self.user.save()
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.client = Client(headers={'Authorization': 'Bearer ' + access_token})
+
+    def test_user_loaded_once(self):
+        self.client.get('/api/user/')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/')
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['username'], 'test_username')
+        self.assertEqual(user_cache.stats()['local_hits'], 1)
+
+    def test_update_auto_reply_invalidates_user(self):
+        self.client.get('/api/user/')
+
+        self.client.patch('/api/user/update-auto-reply?auto_post_reply=5')
+        response = self.client.get('/api/user/')
+
+        self.assertEqual(json.loads(response.content)['auto_post_reply'], 5)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get('/api/user/')
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/api/user/')
+
+        self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+
+    def test_update_auto_reply_keeps_other_fields(self):
+        self.client.get('/api/user/')
+
+        # Changed by another process while the cached user is still served.
+        User.objects.filter(id=self.user.id).update(is_active=False, password=make_password('new_pass'))
+        self.client.patch('/api/user/update-auto-reply?auto_post_reply=5')
+
+        user = User.objects.get(id=self.user.id)
+        self.assertEqual(user.auto_post_reply, 5)
+        self.assertFalse(user.is_active)
+        self.assertTrue(user.check_password('new_pass'))
+
+    def test_password_hash_not_cached(self):
+        self.client.get('/api/user/')
+
+        self.assertNotIn(self.user.password, user_cache.get(self.user.id).values())